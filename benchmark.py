@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Benchmarks for the collage pipeline
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from argparse import ArgumentParser
+from image_process import ImageProcess
+from encoder_profiles import PROFILES
+from PIL import Image
+from os.path import basename, isdir
+from sys import exit
+import glob
+import time
+
+
+def overlap(box1, box2):
+    """
+    Intersection over union of two (x, y, w, h) boxes
+    """
+    x1 = max(box1[0], box2[0])
+    y1 = max(box1[1], box2[1])
+    x2 = min(box1[0] + box1[2], box2[0] + box2[2])
+    y2 = min(box1[1] + box1[3], box2[1] + box2[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = box1[2] * box1[3] + box2[2] * box2[3] - inter
+    return inter / union if union else 0.0
+
+
+def timed_detection(process, image, max_side, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        faces = process.detect_faces(image, max_side=max_side)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return faces, best
+
+
+def detection(process, images, sizes, source_size, repeat):
+    """
+    Compares full resolution face detection against bounded working resolutions.
+    A face counts as found if a box with IoU >= 0.5 matches a full resolution face.
+    """
+    rows = []
+    reference = []
+    for img in images:
+        img.thumbnail((source_size, source_size), Image.LANCZOS)
+        reference.append(timed_detection(process, img, 0, repeat))
+    total = sum(len(faces) for faces, _ in reference)
+    rows.append(('full', sum(t for _, t in reference), total, total, 0))
+    for size in sizes:
+        elapsed = 0.0
+        found = 0
+        matched = 0
+        extra = 0
+        for img, (ref, _) in zip(images, reference):
+            faces, t = timed_detection(process, img, size, repeat)
+            elapsed += t
+            found += len(faces)
+            hits = sum(1 for box in ref.boxes if any(overlap(box, other) >= 0.5 for other in faces.boxes))
+            matched += hits
+            extra += len(faces) - hits
+        rows.append((str(size), elapsed, found, matched, extra))
+
+    print('Face detection on %d images, longest side %d px, best of %d runs' % (len(images), source_size, repeat))
+    print('%-8s %10s %8s %8s %8s %9s' % ('size', 'time (s)', 'faces', 'matched', 'extra', 'speed-up'))
+    for name, elapsed, found, matched, extra in rows:
+        print('%-8s %10.3f %8d %8d %8d %8.1fx' % (name, elapsed, found, matched, extra, rows[0][1] / elapsed))
+
+
+def latest_output():
+    """
+    Returns the newest collage<time-stamp> folder main.py created in the
+    working directory, or None
+    """
+    folders = [path for path in glob.glob('collage*') if isdir(path)]
+    return max(folders) if folders else None
+
+
+def collage_paths(process, folder):
+    """
+    Returns the paths of the collages main.py saved in folder, source photos
+    and other images are left out
+    """
+    return [path for path in process.list_images(folder) if basename(path).startswith('collage')]
+
+
+def encoding(images, profiles, repeat):
+    """
+    Encodes every image with each encoder profile into memory and reports the
+    time per image and the average file size, relative to the default profile
+    """
+    images = [img.convert('RGB') for img in images]
+    pixels = sum(img.size[0] * img.size[1] for img in images)
+    rows = []
+    for name in profiles:
+        profile = PROFILES[name]
+        elapsed = 0.0
+        size = 0
+        for img in images:
+            best = None
+            for _ in range(repeat):
+                start = time.time()
+                data = profile.encode(img)
+                t = time.time() - start
+                best = t if best is None else min(best, t)
+            elapsed += best
+            size += len(data)
+        rows.append((name, elapsed, size))
+
+    print('Encoding %d images (%.1f MP in total), best of %d runs' % (len(images), pixels / 1e6, repeat))
+    print('%-13s %12s %10s %12s %10s' % ('profile', 'ms / image', 'KB / image', 'bits / pixel', 'size'))
+    reference = dict((name, size) for name, elapsed, size in rows).get('default', rows[0][2])
+    for name, elapsed, size in rows:
+        print('%-13s %12.1f %10.1f %12.2f %9.0f%%' % (name, elapsed / len(images) * 1e3, size / len(images) / 1024.0,
+                                                  size * 8.0 / pixels, size * 100.0 / reference))
+
+
+if __name__ == "__main__":
+    # Argument parsing
+    parser = ArgumentParser(description='Automatic Photo Collage Maker benchmarks.')
+    parser.add_argument('benchmark', choices=['detection', 'encode'],
+                        help='which stage of the pipeline to benchmark')
+    parser.add_argument('-f', '--folder', dest='folder',
+                        help='folder with images (*.jpg, *.jpeg, *.png), default: tests for detection, '
+                             'the newest main.py output folder for encode')
+    parser.add_argument('-s', '--sizes', dest='sizes', type=int, nargs='+', default=[400, 500, 600],
+                        help='working resolutions (longest side) for face detection')
+    parser.add_argument('--source-size', dest='source_size', type=int, default=1800,
+                        help='longest side of the images before detection')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3,
+                        help='number of runs per measurement, the fastest one is reported')
+    parser.add_argument('-p', '--profiles', dest='profiles', nargs='+', choices=sorted(PROFILES),
+                        default=list(PROFILES), help='encoder profiles to compare')
+    args = parser.parse_args()
+
+    if args.folder is None:
+        args.folder = 'tests' if args.benchmark == 'detection' else latest_output()
+        if args.folder is None:
+            print('No collage folder of main.py found. Run main.py first or pass a folder of collages with -f.')
+            exit(1)
+    if not isdir(args.folder):
+        print('Please provide a directory containing images.. ')
+        exit(1)
+    process = ImageProcess()
+
+    if args.benchmark == 'detection':
+        count, images = process.processdir(args.folder)
+        detection(process, images, args.sizes, args.source_size, args.repeat)
+    elif args.benchmark == 'encode':
+        # encoders are compared on collages, source photos are already JPEG compressed
+        paths = collage_paths(process, args.folder)
+        if not paths:
+            print('No collages found in %s. Run main.py first and pass its output folder with -f.' % args.folder)
+            exit(1)
+        images = [process.load_image(path) for path in paths]
+        encoding(images, args.profiles, args.repeat)
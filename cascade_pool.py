@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Process-wide pool of Haar cascade classifiers
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import os
+import threading
+import time
+import cv2
+
+
+class CascadePool():
+    """
+    Lazily initialised registry of the cascade classifiers found in Data/.
+    Every cascade file is parsed at most once per worker thread: classifiers are
+    kept per thread since detectMultiScale is not re-entrant, and a forked worker
+    process starts with an empty pool instead of sharing its parent's classifiers.
+    """
+
+    def __init__(self, directory='Data'):
+        self.directory = directory
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {}
+
+    def available(self):
+        """
+        Returns the names of all the cascades which can be loaded from the directory
+        """
+        return sorted(os.path.splitext(fn)[0] for fn in os.listdir(self.directory)
+                      if fn.lower().endswith('.xml'))
+
+    def get(self, name='haarcascade_frontalface_default'):
+        """
+        Returns the classifier for given cascade name or file, loading it on first use
+        """
+        if os.getpid() != self._pid:
+            # Spawned without fork hooks, e.g. on old interpreters
+            self._reset()
+        name = os.path.splitext(os.path.basename(name))[0]
+        classifiers = getattr(self._local, 'classifiers', None)
+        if classifiers is None:
+            classifiers = self._local.classifiers = {}
+        classifier = classifiers.get(name)
+        if classifier is None:
+            classifier = classifiers[name] = self._load(name)
+        return classifier
+
+    def _load(self, name):
+        path = os.path.join(self.directory, name + '.xml')
+        start = time.time()
+        classifier = cv2.CascadeClassifier(path)
+        elapsed = time.time() - start
+        if classifier.empty():
+            raise IOError('Could not load cascade file %s' % path)
+        with self._lock:
+            stat = self.stats.setdefault(name, {'loads': 0, 'seconds': 0.0, 'threads': []})
+            stat['loads'] += 1
+            stat['seconds'] += elapsed
+            stat['threads'].append(threading.current_thread().name)
+        return classifier
+
+    def load_stats(self):
+        """
+        Returns per cascade load counts and parse time for the current process
+        """
+        with self._lock:
+            return {'pid': self._pid,
+                    'cascades': {name: dict(stat, threads=list(stat['threads']))
+                                 for name, stat in self.stats.items()}}
+
+
+# Shared pool used by every ImageProcess in this process
+cascades = CascadePool()
@@ -5,10 +5,9 @@ Script:     Abstract derived class for collage creation
 @author:    Pranav Gundewar
 """
 # Importing Libraries
-from PIL import Image
 from image_process import ImageProcess
+from layout_template import load_templates
 import random
-import os
 
 
 class CollageCreation(ImageProcess):
@@ -20,90 +19,80 @@ class CollageCreation(ImageProcess):
         # self.extensions = ['.jpg', '.jpeg', '.png']
         ImageProcess.__init__(self)
         self.output = output_dir
-        self.text = text
+        # text is one caption or a list of them, each collage is saved once per caption
+        self.captions = [t for t in (text if isinstance(text, (list, tuple)) else [text]) if t]
+        self.text = self.captions[0] if self.captions else None
+        # Longest side any layout needs from a source image
+        self.source_size = 1200
+        # Minimum number of photos each layout needs
+        self.layout_requirements = [('collage_3_hor', 3), ('collage_2_hor', 2), ('collage_4', 4),
+                                    ('black_magic', 4), ('portfolio', 3), ('make_collage', 2)]
+        # Declarative layouts of layouts/*.json, compiled once into paste plans
+        self.templates = load_templates('layouts')
+        self.plans = dict((name, template.compile()) for name, template in self.templates.items())
         # print(self.output, self.text)
 
-    def collage_2_hor(self, list_hor):
-        bg = Image.new('RGB', (790, 1085), (255, 255, 255))
-        random.shuffle(list_hor)
-        horizontal = list_hor[:2]
-        flag = 0
-        for image in horizontal:
-            image = image.resize((780, 535), Image.ANTIALIAS)
-            if(flag == 0):
-                bg.paste(image, (5, 5))
-                flag = 1
-            else:
-                bg.paste(image, (5, 545))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        bg = Image.new('RGB', (1200, 800), (255, 255, 255))
-        random.shuffle(list_hor)
-        horizontal = list_hor[:2]
-        flag = 0
-        for image in horizontal:
-            if(flag == 0):
-                image1 = image.resize((1200, 800), Image.ANTIALIAS)
-                image1 = ImageProcess.face_location(self, image1, 'left')
-                flag = 1
-            else:
-                image2 = image.resize((1200, 800), Image.ANTIALIAS)
-                image2 = ImageProcess.face_location(self, image2, 'right')
+    def plan_layouts(self, count):
+        """
+        Returns the names of the layouts which can be created from count photos.
+        Every photo is usable in both orientations through its face centred crop,
+        so only the number of photos matters.
+        """
+        return [name for name, needed in self.layout_requirements if count >= needed]
 
-        for i in range(bg.size[0]):
-            for j in range(bg.size[1]):
-                if(4 * i + j <= 2800):
-                    pixel = image1.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
-                else:
-                    pixel = image2.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        # plt.imshow(bg)
-        # plt.show()
-        bg.save(filename, quality=90, optimize=True)
+    def render_template(self, name, pools):
+        """
+        Renders and saves the layout template `name`. The pools it draws from
+        are shuffled first, so every call picks different photos.
+        """
+        plan = self.plans[name]
+        for pool in plan.counts:
+            if pool in pools:
+                random.shuffle(pools[pool])
+        scale = self.render_scale(plan.template.canvas)
+        bg = plan.render(pools, self.tile_cache, scale)
+        return self.save_collage(bg, plan.template.text, plan.template.logo, scale=scale)
+
+    def template_groups(self):
+        """
+        Returns the names of all template groups, in file order
+        """
+        groups = []
+        for template in self.templates.values():
+            if template.group not in groups:
+                groups.append(template.group)
+        return groups
 
-        bg = Image.new('RGB', (1200, 800), (255, 255, 255))
-        random.shuffle(list_hor)
-        horizontal = list_hor[:2]
-        flag = 0
-        for image in horizontal:
-            if(flag == 0):
-                image1 = image.resize((1200, 800), Image.ANTIALIAS)
-                image1 = ImageProcess.face_location(self, image1, 'left')
-                flag = 1
-            else:
-                image2 = image.resize((1200, 800), Image.ANTIALIAS)
-                image2 = ImageProcess.face_location(self, image2, 'right')
+    def render_group(self, group, **pools):
+        """
+        Renders every template of a group from the same pools of images
+        """
+        return [self.render_template(name, pools)
+                for name, template in self.templates.items() if template.group == group]
 
-        for i in range(bg.size[0]):
-            for j in range(bg.size[1]):
-                if(4 * i - j <= 2000):
-                    pixel = image1.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
+    def collage_2_hor(self, list_hor):
+        self.render_group('collage_2_hor', horizontal=list_hor)
+
+        # the diagonal layouts are composed at the size of the largest rendition
+        scale = self.render_scale((1200, 800))
+        size = (int(round(1200 * scale)), int(round(800 * scale)))
+        for a, b, c in ((4, 1, 2800), (4, -1, 2000)):
+            random.shuffle(list_hor)
+            horizontal = list_hor[:2]
+            flag = 0
+            for image in horizontal:
+                if(flag == 0):
+                    image1 = self.tile_cache.tile(image, size)
+                    image1 = ImageProcess.face_location(self, image1, 'left', scale)
+                    flag = 1
                 else:
-                    pixel = image2.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        # plt.imshow(bg)
-        # plt.show()
-        bg.save(filename, quality=90, optimize=True)
+                    image2 = self.tile_cache.tile(image, size)
+                    image2 = ImageProcess.face_location(self, image2, 'right', scale)
+
+            bg = ImageProcess.diagonal_composite(self, image1, image2, size, a, b, c * scale)
+            # plt.imshow(bg)
+            # plt.show()
+            self.save_collage(bg, scale=scale)
 
     def collage_3_hor(self, list_hor, list_ver):
         """
@@ -112,251 +101,18 @@ class CollageCreation(ImageProcess):
         if (len(list_hor) == 0):
             print('Plese provide images with width more than height.')
             exit(1)
-
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-
-        bg = Image.new('RGB', (815, 1145), (255, 255, 255))
-        horizontal = horizontal.resize((805, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (5, 5))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (5, 540))
-                flag = 1
-            else:
-                bg.paste(image, (410, 540))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-
-        bg = Image.new('RGB', (800, 1130), (255, 255, 255))
-        horizontal = horizontal.resize((805, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (0, 0))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (0, 530))
-                flag = 1
-            else:
-                bg.paste(image, (400, 530))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        bg = Image.new('RGB', (815, 1145), (255, 255, 255))
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-        horizontal = horizontal.resize((805, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (5, 610))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (5, 5))
-                flag = 1
-            else:
-                bg.paste(image, (410, 5))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        bg = Image.new('RGB', (800, 1130), (255, 255, 255))
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-        horizontal = horizontal.resize((800, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (0, 600))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (0, 0))
-                flag = 1
-            else:
-                bg.paste(image, (400, 0))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.render_group('collage_3_hor', horizontal=list_hor, vertical=list_ver)
 
     def collage_4(self, image_list):
         """
-        This function create 2 layouts for vertical images
-        [* *    [* _
-         * *]   *_]
+        This function create 3 layouts for vertical images
+        [* *    [* _    [**
+         * *]   *_]     **]
         """
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (750, 1130), (255, 255, 255))
-        for image in list1:
-            image = image.resize((360, 550), Image.ANTIALIAS)
-            if count == 1:
-                bg.paste(image, (10, 10))
-            elif count == 2:
-                bg.paste(image, (380, 10))
-            elif count == 3:
-                bg.paste(image, (10, 570))
-            else:
-                bg.paste(image, (380, 570))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(image_list)
-        list2 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (730, 1120), (255, 255, 255))
-        for image in list2:
-            image = image.resize((350, 500), Image.ANTIALIAS)
-            if count == 1:
-                bg.paste(image, (10, 10))
-            elif count == 2:
-                bg.paste(image, (370, 100))
-            elif count == 3:
-                bg.paste(image, (10, 520))
-            else:
-                bg.paste(image, (370, 610))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'top right')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(image_list)
-        list3 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (760, 1140), (255, 255, 255))
-        for image in list3:
-            image = image.resize((400, 600), Image.ANTIALIAS)
-            if count == 1:
-                bg.paste(image, (0, 0))
-            elif count == 2:
-                bg.paste(image, (400, 0))
-            elif count == 3:
-                bg.paste(image, (0, 600))
-            else:
-                bg.paste(image, (400, 600))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.render_group('collage_4', vertical=image_list)
 
     def black_magic(self, image_list):
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (735, 1055), (255, 255, 255))
-        for image in list1:
-            if count == 1:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (5, 5))
-            if count == 2:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (330, 450))
-            if count == 3:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (420, 5))
-            else:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (15, 610))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        # bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (735, 1055), (255, 255, 255))
-        for image in list1:
-            if count == 1:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (330, 5))
-            if count == 2:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (5, 450))
-            if count == 3:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (420, 610))
-            else:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (15, 5))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        # bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.render_group('black_magic', vertical=image_list)
 
     def portfolio(self, image_list, horizontal):
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (1200, 1200), (255, 255, 255))
-        horizontal = horizontal.resize((1200, 600), Image.ANTIALIAS)
-        bg.paste(horizontal, (0, 0))
-        for image in list1:
-            if count == 1:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (0, 600))
-            if count == 2:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (400, 600))
-            if count == 3:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (800, 600))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        if self.text:
-            bg = ImageProcess.draw_text(self, bg, self.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.render_group('portfolio', vertical=image_list, hero=[horizontal])
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     In-memory collage rendering for embedding the engine in a service
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from functools import partial
+from PIL import Image
+from collage_create import CollageCreation
+from encoder_profiles import PROFILES
+from image_handle import ImageHandle
+from tile_cache import TileCache
+
+
+class CollageRenderer(CollageCreation):
+    """
+    Renders one layout from a list of images or paths and returns the encoded
+    bytes, or the PIL images, with the layout metadata. Nothing is written:
+    no output directory, layer store, metadata cache or encoder threads are
+    used, paths are only read. The images fill the layout in the given order,
+    they are not shuffled. A renderer keeps per call state, use one per thread.
+
+        renderer = CollageRenderer(text='Save the date', profile='web')
+        result = renderer.render(['a.jpg', 'b.jpg', 'c.jpg', 'd.jpg'], 'collage_4_grid')[0]
+        result['data'], result['size'], result['cells']
+    """
+
+    # layout of justified rows, next to the names of layouts/*.json
+    justified = 'make_collage'
+
+    def __init__(self, text=None, profile='default', renditions=None, max_bytes=None):
+        CollageCreation.__init__(self, None, text)
+        self.profile = PROFILES[profile]
+        self.renditions = renditions
+        if renditions:
+            self.source_size = max(self.source_size, max(renditions))
+        self.max_bytes = max_bytes
+
+    def layouts(self):
+        """
+        Returns the names of the layouts render() accepts
+        """
+        return list(self.templates) + [self.justified]
+
+    def render(self, images, layout, encode=True, width=800, init_height=300):
+        """
+        Renders `layout` from images (PIL images or paths) and returns one dict
+        per caption and rendition with 'data' (encoded bytes, or 'image' when
+        encode is False), 'format', 'size', 'caption', 'rendition', 'layout'
+        and 'cells', the {'input', 'box'} rectangles of the images in it.
+        Budgeted encodes add 'quality' and 'fits'. width and init_height only
+        apply to the justified rows layout. Raises ValueError for an unknown
+        layout or too few images.
+        """
+        if layout not in self.layouts():
+            raise ValueError('Layout %s not found. Available layouts: %s' % (layout, ', '.join(self.layouts())))
+        # tiles are shared by the cells of one call only
+        self.tile_cache = TileCache()
+        images = [self.open(image) for image in images]
+        if layout == self.justified:
+            collage = self.justified_collage(images, width, init_height) if len(images) >= 2 else None
+            if collage is None:
+                raise ValueError('At least 2 images are needed for %s' % layout)
+            bg, cells, scale = collage
+            text_location, logo, caption = 'bottom left', True, False
+        else:
+            plan = self.plans[layout]
+            pools, inputs = self.pools(images, plan.counts)
+            if any(len(pools.get(pool, ())) < count for pool, count in plan.counts.items()):
+                raise ValueError('%s needs %d images, %d given'
+                                 % (layout, max(plan.counts.values()), len(images)))
+            scale = self.render_scale(plan.template.canvas)
+            bg = plan.render(pools, self.tile_cache, scale)
+            cells = [(inputs[pool][slot], box) for index, pool, slot, box in plan.cells(pools, scale)]
+            text_location, logo, caption = plan.template.text, plan.template.logo, True
+        results = []
+        for suffix, text, img, factor in self.finished_images(bg, text_location, logo, caption, scale):
+            ratio = float(img.size[0]) / bg.size[0]
+            result = {'layout': layout, 'caption': text, 'size': img.size,
+                      'rendition': max(img.size) if self.renditions else None,
+                      'format': Image.registered_extensions()[self.profile.ext],
+                      'cells': [{'input': index, 'box': tuple(int(round(d * ratio)) for d in box)}
+                                for index, box in cells]}
+            if not encode:
+                result['image'] = img
+            elif self.max_bytes is None:
+                result['data'] = self.profile.encode(img)
+            else:
+                result['data'], stats = self.profile.encode_within(img, self.max_bytes, self.budget_workers)
+                result['quality'], result['fits'] = stats['quality'], stats['fits']
+            results.append(result)
+        self.tile_cache.clear()
+        return results
+
+    def open(self, image):
+        """
+        Returns a handle decoding a path on demand, or the RGB PIL image
+        """
+        if isinstance(image, Image.Image):
+            return image if image.mode == 'RGB' else image.convert('RGB')
+        return ImageHandle(self, image, self.source_size)
+
+    def pools(self, images, counts):
+        """
+        Returns the source pools of a template from images, as main.py fills
+        them: every photo goes to its own orientation and, through its face
+        centred crop, to the other one, the first photo is the hero. Only the
+        pools in counts are filled. Also returns the input index of every
+        pool entry.
+        """
+        pools, inputs = {}, {}
+        crops = {'horizontal': (900, 600), 'vertical': (600, 900)}
+        for index, image in enumerate(images):
+            width, height = self.dimensions(image)
+            own = 'vertical' if width < height else 'horizontal'
+            for pool, size in crops.items():
+                if pool not in counts:
+                    continue
+                source = image
+                if pool != own:
+                    source = self.derive(image, partial(self.face_detection, output_width=size[0],
+                                                        output_height=size[1]))
+                pools.setdefault(pool, []).append(source)
+                inputs.setdefault(pool, []).append(index)
+        if 'hero' in counts and images:
+            pools['hero'] = [self.face_detection(self.pixels(images[0]), 900, 450)]
+            inputs['hero'] = [0]
+        return pools, inputs
+
+    def derive(self, image, transform):
+        """
+        Returns transform(image), computed on demand for handles
+        """
+        if isinstance(image, ImageHandle):
+            return image.derive(transform)
+        return transform(image)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     pytest setup, the modules live at the top level of the repository
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
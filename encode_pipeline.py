@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Background encoding and writing of finished collages
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+class EncodePipeline():
+    """
+    Encodes finished collages and writes them to disk on a pool of threads.
+    Pillow releases the GIL while it encodes, so the next collage is composited
+    while the previous ones are encoded. At most `pending` collages wait for
+    their encode, which bounds the memory held by the queue. flush() waits
+    until every submitted file is written.
+    """
+
+    def __init__(self, workers=2, pending=None):
+        self.workers = workers
+        self.pending = pending or 2 * max(1, workers)
+        self._pool = None
+        self._futures = []
+        self._slots = threading.BoundedSemaphore(self.pending)
+        self._lock = threading.Lock()
+
+    def submit(self, save, image, filename, **params):
+        """
+        Queues save(image, filename, **params), e.g. OutputNames.save, which
+        returns the written path. The image must not be modified afterwards.
+        Returns a Future of the path.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max(1, self.workers))
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(save, image, filename, **params)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def flush(self):
+        """
+        Waits for every queued collage and returns their filenames in submit
+        order. The first encode or write error is raised here.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        filenames = []
+        error = None
+        for future in futures:
+            try:
+                filenames.append(future.result())
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return filenames
+
+    def close(self):
+        try:
+            return self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
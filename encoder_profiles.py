@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Named encoder settings for the collage outputs
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import time
+from PIL import Image
+
+
+class EncoderProfile():
+    """
+    File extension plus Pillow save() parameters of one output channel
+    """
+
+    def __init__(self, name, ext, description, **params):
+        self.name = name
+        self.ext = ext
+        self.description = description
+        self.params = params
+
+    def __repr__(self):
+        return 'EncoderProfile(%r, %r, %r)' % (self.name, self.ext, self.params)
+
+    def encode(self, image, **overrides):
+        """
+        Returns the encoded bytes of image, overrides replace profile params
+        """
+        params = dict(self.params, **overrides)
+        buffer = BytesIO()
+        image.save(buffer, Image.registered_extensions()[self.ext], **params)
+        return buffer.getvalue()
+
+    def encode_within(self, image, max_bytes, workers=1):
+        """
+        Returns (data, stats) for the highest quality encode of image, up to
+        the profile quality, which takes at most max_bytes. Quality is binary
+        searched on in-memory encodes; with several workers every round probes
+        that many evenly spaced qualities in parallel threads. If even quality
+        1 is too large the smallest encode is returned with stats['fits'] False.
+        stats also holds the chosen quality, size, attempts and seconds spent.
+        """
+        if 'quality' not in self.params:
+            raise ValueError('Encoder profile %s has no quality setting' % self.name)
+        start = time.time()
+        attempts = 1
+        best = (self.params['quality'], self.encode(image))
+        smallest = best
+        if len(best[1]) > max_bytes:
+            best = None
+            lo, hi = 1, self.params['quality'] - 1
+            pool = ThreadPoolExecutor(workers) if workers > 1 else None
+            # Image.save keeps per call state on the image, so threads never share one
+            copies = [image] + [image.copy() for _ in range(workers - 1)]
+            try:
+                while lo <= hi:
+                    count = min(max(1, workers), hi - lo + 1)
+                    probes = sorted(set(lo + (hi - lo) * (i + 1) // (count + 1) for i in range(count)))
+                    if pool is not None:
+                        encodes = list(pool.map(lambda i: self.encode(copies[i], quality=probes[i]),
+                                                range(len(probes))))
+                    else:
+                        encodes = [self.encode(image, quality=q) for q in probes]
+                    attempts += len(probes)
+                    new_lo, new_hi = lo, hi
+                    for quality, data in zip(probes, encodes):
+                        if len(data) <= max_bytes:
+                            if best is None or quality > best[0]:
+                                best = (quality, data)
+                            new_lo = max(new_lo, quality + 1)
+                        else:
+                            new_hi = min(new_hi, quality - 1)
+                            if len(data) < len(smallest[1]):
+                                smallest = (quality, data)
+                    lo, hi = new_lo, new_hi
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+        fits = best is not None
+        quality, data = best if fits else smallest
+        stats = {'quality': quality, 'bytes': len(data), 'attempts': attempts,
+                 'seconds': time.time() - start, 'fits': fits}
+        return data, stats
+
+
+PROFILES = dict((profile.name, profile) for profile in [
+    EncoderProfile('default', '.jpg', 'baseline JPEG, as the collages have always been saved',
+                   quality=90, optimize=True),
+    EncoderProfile('fast-preview', '.jpg', 'quick low quality JPEG, no Huffman optimisation',
+                   quality=70, optimize=False, subsampling='4:2:0'),
+    EncoderProfile('web', '.jpg', 'progressive optimised JPEG with 4:2:0 chroma subsampling',
+                   quality=85, optimize=True, progressive=True, subsampling='4:2:0'),
+    EncoderProfile('print', '.jpg', 'high quality JPEG without chroma subsampling',
+                   quality=95, optimize=True, subsampling='4:4:4'),
+    EncoderProfile('webp', '.webp', 'lossy WebP',
+                   quality=85, method=4),
+    EncoderProfile('png', '.png', 'lossless PNG',
+                   compress_level=6),
+])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Per-image face metadata shared by every layout
+@author:    Pranav Gundewar
+"""
+
+
+class FaceMetadata():
+    """
+    Face boxes (x, y, w, h) of an image, stored in the coordinates of the image
+    size they were detected on. Boxes for any resized copy of the image are
+    derived by scaling, so detection only has to run once per photo.
+    """
+
+    key = 'faces'
+
+    def __init__(self, size, boxes):
+        self.size = (int(size[0]), int(size[1]))
+        self.boxes = [tuple(int(v) for v in box) for box in boxes]
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __repr__(self):
+        return 'FaceMetadata(size=%r, boxes=%r)' % (self.size, self.boxes)
+
+    def scaled(self, size):
+        """
+        Returns the face boxes scaled to an image of given size
+        """
+        sx = size[0] / self.size[0]
+        sy = size[1] / self.size[1]
+        return [(int(round(x * sx)), int(round(y * sy)), int(round(w * sx)), int(round(h * sy)))
+                for (x, y, w, h) in self.boxes]
+
+    def largest(self, size=None):
+        """
+        Returns the widest face box, scaled to given size, or None if there are no faces
+        """
+        if not self.boxes:
+            return None
+        boxes = self.scaled(size) if size is not None else self.boxes
+        return max(boxes, key=lambda box: box[2])
+
+    def cropped(self, region):
+        """
+        Returns metadata for the crop (x1, y1, x2, y2) of this image.
+        Faces which lie completely outside the region are dropped.
+        """
+        x1, y1, x2, y2 = region
+        boxes = []
+        for (x, y, w, h) in self.boxes:
+            if x + w > x1 and x < x2 and y + h > y1 and y < y2:
+                boxes.append((x - x1, y - y1, w, h))
+        return FaceMetadata((x2 - x1, y2 - y1), boxes)
+
+    def attach(self, image):
+        """
+        Stores the metadata on the image. Pillow carries `info` over to resized
+        copies of the image, crops have to attach their own metadata.
+        """
+        image.info[self.key] = self
+        return image
+
+    @classmethod
+    def of(cls, image):
+        """
+        Returns the metadata attached to the image or None
+        """
+        return image.info.get(cls.key)
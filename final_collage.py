@@ -12,7 +12,9 @@ from PIL import Image
 from os.path import isfile, isdir
 from sys import exit
 from PIL.ExifTags import TAGS
-import time
+from layout_solver import collage_geometry
+from output_names import OutputNames
+from tile_cache import TileCache
 
 
 class ImageProcess:
@@ -22,6 +24,10 @@ class ImageProcess:
 
     def __init__(self):
         self.extensions = ['.jpg', '.jpeg', '.png']
+        # Collision-free collage names in the working directory
+        self.names = OutputNames('.')
+        # Resized tiles, reduced through an image pyramid and shared by the collages of a run
+        self.tile_cache = TileCache()
 
     def processdir(self, filename):
         """
@@ -83,26 +89,28 @@ class ImageProcess:
             pass
         return image
 
-    def collage_creation(self, coefs_lines, collage_image, width, init_height):
+    def collage_creation(self, images, cells, collage_image):
+        """
+        Render phase: resamples every source once, straight to the size of its
+        cell, through the tile cache, and pastes it. The source images
+        themselves are never modified.
+        Resample count and pixels processed are kept in self.render_stats.
+        """
         margin_size = 2
-        y = 0
-        for coef, images in coefs_lines:
-            if images:
-                x = 0
-                for img in images:
-                        # if need to enlarge an image - use `resize`, otherwise use `thumbnail`, it's faster
-                    k = (init_height / coef) / img.size[1]
-                    if k > 1:
-                        img = img.resize((int(img.size[0] * k), int(img.size[1] * k)), Image.ANTIALIAS)
-                    else:
-                        img.thumbnail((int(width / coef), int(init_height / coef)), Image.ANTIALIAS)
-                    w, h = img.size
-                    if(w + x > width):
-                        if (int(width - x) > 0):
-                            img = img.resize((int(width - x), h), Image.ANTIALIAS)
-                    collage_image.paste(img, (int(x), int(y)))
-                    x += img.size[0] + margin_size
-                y += int(init_height / coef) + margin_size
+        resamples = 0
+        pixels_read = 0
+        for index, (x, y, w, h) in cells:
+            source = images[index]
+            misses = self.tile_cache.misses
+            img = self.tile_cache.tile(source, (w, h))
+            if self.tile_cache.misses != misses:
+                resamples += 1
+                pixels_read += source.size[0] * source.size[1]
+            collage_image.paste(img, (x, y))
+        pixels_written = sum(w * h for index, (x, y, w, h) in cells)
+        self.render_stats = {'resamples': resamples, 'pixels_read': pixels_read, 'pixels_written': pixels_written}
+        print('Rendered %d tiles with %d resamples, %.1f MP read, %.1f MP written'
+              % (len(cells), resamples, pixels_read / 1e6, pixels_written / 1e6))
         w, h = collage_image.size
         collage = Image.new('RGB', (w + margin_size, h + margin_size), (35, 35, 35))
         collage.paste(collage_image, (margin_size, margin_size))
@@ -113,42 +121,11 @@ class ImageProcess:
         Make a collage image with a width equal to `width` from `images` and save to `filename`.
         """
         margin_size = 2
-        # run until a suitable arrangement of images is found
-        while True:
-            # copy images to images_list
-            images_list = images[:]
-            coefs_lines = []
-            images_line = []
-            x = 0
-            while images_list:
-                # get first image and resize to `init_height`
-                img = images_list.pop(0)
-                img.thumbnail((width, init_height), Image.ANTIALIAS)
-                # when `x` will go beyond the `width`, start the next line
-                if x > width:
-                    coefs_lines.append((float(x) / width, images_line))
-                    images_line = []
-                    x = 0
-                x += img.size[0] + margin_size
-                images_line.append(img)
-            # finally add the last line with images
-            coefs_lines.append((float(x) / width, images_line))
-
-            # compact the lines, by reducing the `init_height`, if any with one or less images
-            if len(coefs_lines) <= 1:
-                break
-            if any(map(lambda c: len(c[1]) <= 1, coefs_lines)):
-                # reduce `init_height`
-                init_height -= 10
-            else:
-                break
+        # geometry phase: row and cell rectangles from image sizes only
+        sizes = [img.size for img in images]
+        out_height, cells = collage_geometry(sizes, width, init_height, margin_size)
         print('Suitable arrangement of images has been found out..')
 
-        # get output height
-        out_height = 0
-        for coef, imgs_line in coefs_lines:
-            if imgs_line:
-                out_height += int(init_height / coef) + margin_size
         if not out_height:
             print('Height of collage could not be 0!')
             return False
@@ -157,11 +134,9 @@ class ImageProcess:
         print('Dimension of background canvas has been obtained..')
         # put images to the collage
         # Call self function to access functions in the same class
-        collage_image = self.collage_creation(coefs_lines, collage_image, width, init_height)
-        # Putting timestamp to the image output filename
-        timestr = time.strftime("%Y%m%d-%H%M%S")
-        filename = 'collage' + timestr + '.jpg'
-        collage_image.save(filename, quality=95)
+        collage_image = self.collage_creation(images, cells, collage_image)
+        # Run timestamp and sequence number make the output filename unique
+        self.names.save(collage_image, self.names.name(), quality=95)
         return True
 
 
@@ -191,14 +166,12 @@ if __name__ == "__main__":
             print('Failed to create collage!')
             exit(1)
         print('Collage 1 has been created.')
-        time.sleep(1)   # delays for 1 second
         random.shuffle(images)
         res = process.make_collage(images, 1150, 375)
         if not res:
             print('Failed to create collage!')
             exit(1)
         print('Collage 2 has been created.')
-        time.sleep(1)   # delays for 1 second
         random.shuffle(images)
         res = process.make_collage(images, 1200, 425)
         if not res:
@@ -212,14 +185,12 @@ if __name__ == "__main__":
             print('Failed to create collage!')
             exit(1)
         print('Collage 1 has been created.')
-        time.sleep(1)   # delays for 1 second
         random.shuffle(images)
         res = process.make_collage(images, 1000, 250)
         if not res:
             print('Failed to create collage!')
             exit(1)
         print('Collage 2 has been created.')
-        time.sleep(1)   # delays for 1 second
         random.shuffle(images)
         res = process.make_collage(images, 800, 350)
         if not res:
@@ -8,13 +8,22 @@ Program by :
 from argparse import ArgumentParser
 import os
 import random
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from os.path import isfile, isdir
 from sys import exit
 from PIL.ExifTags import TAGS
 import time
 import numpy as np
 import cv2
+from cascade_pool import cascades
+from font_registry import fonts
+from ingest import ImageIngest
+from layout_template import load_templates
+from tile_cache import TileCache
+from output_names import OutputNames
+
+# Diagonal split masks shared by every collage, keyed by (canvas size, split line)
+_split_masks = {}
 
 
 class ImageProcess():
@@ -24,16 +33,19 @@ class ImageProcess():
 
     def __init__(self):
         self.extensions = ['.jpg', '.jpeg', '.png']
+        # Longest side of the working copy used for face detection, None for full resolution
+        self.detection_size = None
+        # Fonts of Fonts/ used for the caption and the logo, by name
+        self.caption_font = 'arial'
+        self.logo_font = 'Verdana'
         # self.output_width = 1200
         # self.output_height = 800
 
-    def processdir(self, filename):
+    def list_images(self, filename):
         """
-                Creates the list of all the files with given extensions
-                and returns list and filecount
+                Returns the paths of all the files with given extensions
         """
         filecount = 0  # Number of files successfully updated
-        count = 0   # Number of images successfully updated
         files = []
         images = []
         for fn in os.listdir(filename):
@@ -45,15 +57,21 @@ class ImageProcess():
             for ext in self.extensions:
                 if os.path.splitext(fn)[1].lower() == ext:
                     images.append(fn)
-                    count += 1
+        return images
 
+    def processdir(self, filename):
+        """
+                Creates the list of all the files with given extensions
+                and returns list and filecount
+        """
+        images = self.list_images(filename)
         image_list = []
         for img_path in images:
             img = Image.open(img_path)
             img = self.reorient_image(img)
             # img.thumbnail([2400, 2400], Image.ANTIALIAS)
             image_list.append(img)
-        return count, image_list
+        return len(images), image_list
 
     def reorient_image(self, image):
         """
@@ -94,7 +112,7 @@ class ImageProcess():
         """
         now = time.time()
         localtime = time.localtime(now)
-        milliseconds = '%02d' % int((now - int(now)) * 1000)
+        milliseconds = '%03d' % int((now - int(now)) * 1000)
         return time.strftime('%Y%m%d-%H%M%S', localtime) + milliseconds
 
     def draw_text(self, img, text, font_size, location):
@@ -106,11 +124,10 @@ class ImageProcess():
                     location - tuple(width, height) where you would like to print on the image
         """
 
-        font = ImageFont.truetype("Fonts/arial.ttf", font_size)
+        font = fonts.font(self.caption_font, font_size)
         width, height = img.size
         img_draw = ImageDraw.Draw(img)
-        line_height = font.getsize(text)[1]
-        line_width = font.getsize(text)[0]
+        line_width, line_height = fonts.getsize(font, text)
         margin = 20
         color = self.color_chooser(img, line_height, line_width, location)
         if location == 'bottom left':
@@ -119,21 +136,24 @@ class ImageProcess():
             coord = (width - line_width - margin, margin)
         else:
             coord = (width - line_width - margin, height - line_height - margin)
-        img_draw.text(coord, text, fill=color, font=font)
+        # coord is where the ink starts, ImageDraw.text places the text origin
+        left, top = fonts.bbox(font, text)[:2]
+        img_draw.text((coord[0] - left, coord[1] - top), text, fill=color, font=font)
         return img
 
     def put_logo(self, img, text, font_size, location):
         """
         This function allows to put transparent logo on the image
         """
-        font = ImageFont.truetype("Fonts/Verdana.ttf", font_size)
+        font = fonts.font(self.logo_font, font_size)
         width, height = img.size
         img_draw = ImageDraw.Draw(img)
-        line_height = font.getsize(text)[1]
-        line_width = font.getsize(text)[0]
+        line_width, line_height = fonts.getsize(font, text)
         margin = 20
         color = self.color_chooser(img, line_height, line_width, location)
         coord = (width - line_width - margin, height - line_height - margin)
+        left, top = fonts.bbox(font, text)[:2]
+        coord = (coord[0] - left, coord[1] - top)
         if color == 'black':
             img_draw.text(coord, text, fill=color, font=font)
         else:
@@ -159,40 +179,50 @@ class ImageProcess():
         Returns the color of contrast text
         """
         width, height = image.size
-        f = 0
-        t = 0
         if location == 'bottom left':
-            for i in range(line_width):
-                for j in range(height - line_height, height):
-                    pixel = image.getpixel((i, j))
-                    b = self.contrast(pixel)
-                    if b is False:
-                        f += 1
-                    else:
-                        t += 1
+            box = (0, height - line_height, line_width, height)
         elif location == 'top right':
-            for i in range(width - line_width, width):
-                for j in range(line_height):
-                    pixel = image.getpixel((i, j))
-                    b = self.contrast(pixel)
-                    if b is False:
-                        f += 1
-                    else:
-                        t += 1
+            box = (width - line_width, 0, width, line_height)
         else:
-            for i in range(width - line_width, width):
-                for j in range(height - line_height, height):
-                    pixel = image.getpixel((i, j))
-                    b = self.contrast(pixel)
-                    if b is False:
-                        f += 1
-                    else:
-                        t += 1
-        if f > t:
+            box = (width - line_width, height - line_height, width, height)
+        return self.contrast_colour(image, box)
+
+    def contrast_colour(self, image, box):
+        """
+        Returns 'white' when most pixels of the box are dark, i.e. contrast() is
+        False for them, and 'black' otherwise. Counts over the whole region at
+        once instead of calling getpixel() for every pixel.
+        """
+        region = np.asarray(image.crop(box).convert('RGB'), dtype=np.int32)
+        # brightness(pixel) > 123  <=>  299 R + 587 G + 114 B > 123000
+        luma = region[..., 0] * 299 + region[..., 1] * 587 + region[..., 2] * 114
+        bright = int(np.count_nonzero(luma > 123000))
+        if luma.size - bright > bright:
             return 'white'
         else:
             return 'black'
 
+    def split_mask(self, size, a, b, c):
+        """
+        Returns an 'L' mask of given size which is white wherever a * x + b * y <= c.
+        Masks are cached per (canvas size, split line) so repeated shuffles reuse them.
+        """
+        key = (tuple(size), a, b, c)
+        mask = _split_masks.get(key)
+        if mask is None:
+            xs = np.arange(size[0])
+            ys = np.arange(size[1])[:, None]
+            mask = Image.fromarray(np.where(a * xs + b * ys <= c, 255, 0).astype(np.uint8))
+            _split_masks[key] = mask
+        return mask
+
+    def diagonal_composite(self, image1, image2, size, a, b, c):
+        """
+        Composites image1 on the side of the line a * x + b * y <= c and image2 on the other side
+        """
+        mask = self.split_mask(size, a, b, c)
+        return Image.composite(image1.convert('RGB'), image2.convert('RGB'), mask)
+
     def image_location(self, image, place, x):
         if place == 'left':
             image = image.crop((x - 200, 0, image.size[0], image.size[1]))
@@ -206,6 +236,29 @@ class ImageProcess():
             # bg.show()
         return bg
 
+    def find_faces(self, grayImage, min_size):
+        """
+        Runs the face cascade on a copy of the grayscale image bounded to
+        self.detection_size on its longest side, with min_size rescaled to match,
+        and returns the face boxes projected back to source coordinates
+        """
+        face_cascade = cascades.get('haarcascade_frontalface_default')
+        height, width = grayImage.shape
+        scale = 1.0
+        if self.detection_size and max(width, height) > self.detection_size:
+            scale = self.detection_size / max(width, height)
+            grayImage = cv2.resize(grayImage, (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+                                   interpolation=cv2.INTER_AREA)
+            min_size = (max(1, int(round(min_size[0] * scale))), max(1, int(round(min_size[1] * scale))))
+        faces = face_cascade.detectMultiScale(grayImage,
+                                              scaleFactor=1.1,
+                                              minNeighbors=5,
+                                              minSize=min_size,
+                                              flags=cv2.CASCADE_SCALE_IMAGE)
+        if len(faces) and scale != 1.0:
+            faces = np.round(np.asarray(faces) / scale).astype(int)
+        return faces
+
     def face_location(self, image, position):
         """
         This function finds the location of face in an image which will help
@@ -216,17 +269,12 @@ class ImageProcess():
         point3 = (700, 600)
         point4 = (700, 200)
         p = (0, 0)
-        face_cascade = cv2.CascadeClassifier('Data/haarcascade_frontalface_default.xml')
         image = np.array(image)
         # Convert RGB to BGR
         image = image[:, :, ::-1].copy()
         grayImage = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-        faces = face_cascade.detectMultiScale(grayImage,
-                                              scaleFactor=1.1,
-                                              minNeighbors=5,
-                                              minSize=(80, 80),
-                                              flags=cv2.CASCADE_SCALE_IMAGE)
+        faces = self.find_faces(grayImage, (80, 80))
 
         if len(faces) == 0:
             print("No faces found")
@@ -272,40 +320,38 @@ class ImageProcess():
 
                 return image
 
+    def largest_face(self, image):
+        """
+        Returns the (x, y, w, h) box of the largest face of an image, or None
+        """
+        grayImage = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+        faces = self.find_faces(grayImage, (90, 90))
+        if len(faces) == 0:
+            return None
+        return tuple(int(v) for v in faces[int(np.argmax([face[2] for face in faces]))])
+
     def face_detection(self, image, output_width, output_height):
         """
         This function finds the location of face in an image which will help
         us determine cropping conditoin
         """
-        face_cascade = cv2.CascadeClassifier('Data/haarcascade_frontalface_default.xml')
-        image = np.array(image)
-        # Convert RGB to BGR
-        image = image[:, :, ::-1]
-        grayImage = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return self.face_crop(image, self.largest_face(image), output_width, output_height)
 
-        faces = face_cascade.detectMultiScale(grayImage,
-                                              scaleFactor=1.1,
-                                              minNeighbors=5,
-                                              minSize=(90, 90),
-                                              flags=cv2.CASCADE_SCALE_IMAGE)
+    def face_crop(self, image, box, output_width, output_height):
+        """
+        Crops output_width x output_height around the face box, a fixed spot
+        near the top when there is no face
+        """
+        x, y, w, h = box if box is not None else (200, 0, 150, 150)
+        return Image.fromarray(self.image_crop(np.array(image), x, y, w, h, output_width, output_height))
 
-        if len(faces) == 0:
-            # print("No faces found")
-            image = self.image_crop(image, 200, 0, 150, 150, output_width, output_height)
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(image)
-        else:
-            m = []
-            for i in range(len(faces)):
-                m.append(faces[i][2])
-            n = np.argmax(m)
-            array = faces[n]
-            box = [array]
-            for (x, y, w, h) in box:
-                image = self.image_crop(image, x, y, w, h, output_width, output_height)
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                image = Image.fromarray(image)
-        return image
+    def working_copy(self, img_path):
+        """
+        Decodes and re-orients an image, shrunk to the size the layouts use
+        """
+        img = self.reorient_image(Image.open(img_path))
+        img.thumbnail((1800, 1800), Image.LANCZOS)
+        return img
 
     def image_crop(self, image, x, y, w, h, output_width, output_height):
         height, width = image.shape[:2]
@@ -353,26 +399,40 @@ class CollageCreation(ImageProcess):
     def __init__(self):
         # self.extensions = ['.jpg', '.jpeg', '.png']
         ImageProcess.__init__(self)
-
-    def collage_2_hor(self, list_hor):
-        bg = Image.new('RGB', (790, 1085), (255, 255, 255))
-        random.shuffle(list_hor)
-        horizontal = list_hor[:2]
-        flag = 0
-        for image in horizontal:
-            image = image.resize((780, 535), Image.ANTIALIAS)
-            if(flag == 0):
-                bg.paste(image, (5, 5))
-                flag = 1
-            else:
-                bg.paste(image, (5, 545))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
+        # Declarative layouts of layouts/*.json, compiled once into paste plans
+        self.templates = load_templates('layouts')
+        self.plans = dict((name, template.compile()) for name, template in self.templates.items())
+        # Resized tiles shared by every layout of the run
+        self.tile_cache = TileCache()
+        # Collision-free names of the collages, created once the output folder is known
+        self.names = None
+
+    def save_collage(self, bg, text_location='bottom left'):
+        """
+        Shared ending of every layout: caption, logo and JPEG encoding
+        """
+        if self.names is None:
+            self.names = OutputNames(args.output)
         if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
+            bg = ImageProcess.draw_text(self, bg, args.text, 30, text_location)
         bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.names.save(bg, self.names.name(), quality=90, optimize=True)
+
+    def render_group(self, group, **pools):
+        """
+        Renders every layout template of a group (see layouts/*.json) from the
+        same pools of images, resized tiles come from the shared tile cache
+        """
+        for template in self.templates.values():
+            if template.group == group:
+                plan = self.plans[template.name]
+                for pool in plan.counts:
+                    if pool in pools:
+                        random.shuffle(pools[pool])
+                self.save_collage(plan.render(pools, self.tile_cache), template.text)
+
+    def collage_2_hor(self, list_hor):
+        self.render_group('collage_2_hor', horizontal=list_hor)
 
         bg = Image.new('RGB', (1200, 800), (255, 255, 255))
         random.shuffle(list_hor)
@@ -380,30 +440,17 @@ class CollageCreation(ImageProcess):
         flag = 0
         for image in horizontal:
             if(flag == 0):
-                image1 = image.resize((1200, 800), Image.ANTIALIAS)
+                image1 = self.tile_cache.tile(image, (1200, 800))
                 image1 = ImageProcess.face_location(self, image1, 'left')
                 flag = 1
             else:
-                image2 = image.resize((1200, 800), Image.ANTIALIAS)
+                image2 = self.tile_cache.tile(image, (1200, 800))
                 image2 = ImageProcess.face_location(self, image2, 'right')
 
-        for i in range(bg.size[0]):
-            for j in range(bg.size[1]):
-                if(4 * i + j <= 2800):
-                    pixel = image1.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
-                else:
-                    pixel = image2.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
+        bg = ImageProcess.diagonal_composite(self, image1, image2, bg.size, 4, 1, 2800)
         # plt.imshow(bg)
         # plt.show()
-        bg.save(filename, quality=90, optimize=True)
+        self.save_collage(bg)
 
         bg = Image.new('RGB', (1200, 800), (255, 255, 255))
         random.shuffle(list_hor)
@@ -411,30 +458,17 @@ class CollageCreation(ImageProcess):
         flag = 0
         for image in horizontal:
             if(flag == 0):
-                image1 = image.resize((1200, 800), Image.ANTIALIAS)
+                image1 = self.tile_cache.tile(image, (1200, 800))
                 image1 = ImageProcess.face_location(self, image1, 'left')
                 flag = 1
             else:
-                image2 = image.resize((1200, 800), Image.ANTIALIAS)
+                image2 = self.tile_cache.tile(image, (1200, 800))
                 image2 = ImageProcess.face_location(self, image2, 'right')
 
-        for i in range(bg.size[0]):
-            for j in range(bg.size[1]):
-                if(4 * i - j <= 2000):
-                    pixel = image1.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
-                else:
-                    pixel = image2.getpixel((i, j))
-                    bg.putpixel((i, j), pixel)
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
+        bg = ImageProcess.diagonal_composite(self, image1, image2, bg.size, 4, -1, 2000)
         # plt.imshow(bg)
         # plt.show()
-        bg.save(filename, quality=90, optimize=True)
+        self.save_collage(bg)
 
     def collage_3_hor(self, list_hor, list_ver):
         """
@@ -443,253 +477,33 @@ class CollageCreation(ImageProcess):
         if (len(list_hor) == 0):
             print('Plese provide images with width more than height.')
             exit(1)
-
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-
-        bg = Image.new('RGB', (815, 1145), (255, 255, 255))
-        horizontal = horizontal.resize((805, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (5, 5))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (5, 540))
-                flag = 1
-            else:
-                bg.paste(image, (410, 540))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-
-        bg = Image.new('RGB', (800, 1130), (255, 255, 255))
-        horizontal = horizontal.resize((805, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (0, 0))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (0, 530))
-                flag = 1
-            else:
-                bg.paste(image, (400, 530))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        bg = Image.new('RGB', (815, 1145), (255, 255, 255))
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-        horizontal = horizontal.resize((805, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (5, 610))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (5, 5))
-                flag = 1
-            else:
-                bg.paste(image, (410, 5))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        bg = Image.new('RGB', (800, 1130), (255, 255, 255))
-        random.shuffle(list_ver)
-        random.shuffle(list_hor)
-        horizontal = list_hor[0]
-        vertical = list_ver[:2]
-        horizontal = horizontal.resize((800, 530), Image.ANTIALIAS)
-        bg.paste(horizontal, (0, 600))
-        flag = 0
-        for image in vertical:
-            image = image.resize((400, 600))
-            if(flag == 0):
-                bg.paste(image, (0, 0))
-                flag = 1
-            else:
-                bg.paste(image, (400, 0))
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.render_group('collage_3_hor', horizontal=list_hor, vertical=list_ver)
 
     def collage_4(self, image_list):
         """
-        This function create 2 layouts for vertical images
-        [* *    [* _
-         * *]   *_]
-        """
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (750, 1130), (255, 255, 255))
-        for image in list1:
-            image = image.resize((360, 550), Image.ANTIALIAS)
-            if count == 1:
-                bg.paste(image, (10, 10))
-            elif count == 2:
-                bg.paste(image, (380, 10))
-            elif count == 3:
-                bg.paste(image, (10, 570))
-            else:
-                bg.paste(image, (380, 570))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(image_list)
-        list2 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (730, 1120), (255, 255, 255))
-        for image in list2:
-            image = image.resize((350, 500), Image.ANTIALIAS)
-            if count == 1:
-                bg.paste(image, (10, 10))
-            elif count == 2:
-                bg.paste(image, (370, 100))
-            elif count == 3:
-                bg.paste(image, (10, 520))
-            else:
-                bg.paste(image, (370, 610))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'top right')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(image_list)
-        list3 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (760, 1140), (255, 255, 255))
-        for image in list3:
-            image = image.resize((400, 600), Image.ANTIALIAS)
-            if count == 1:
-                bg.paste(image, (0, 0))
-            elif count == 2:
-                bg.paste(image, (400, 0))
-            elif count == 3:
-                bg.paste(image, (0, 600))
-            else:
-                bg.paste(image, (400, 600))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        This function create 3 layouts for vertical images
+        [* *    [* _    [**
+         * *]   *_]     **]
+        """
+        self.render_group('collage_4', vertical=image_list)
 
     def black_magic(self, image_list):
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (735, 1055), (255, 255, 255))
-        for image in list1:
-            if count == 1:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (5, 5))
-            if count == 2:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (330, 450))
-            if count == 3:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (420, 5))
-            else:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (15, 610))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
-
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (735, 1055), (255, 255, 255))
-        for image in list1:
-            if count == 1:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (330, 5))
-            if count == 2:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (5, 450))
-            if count == 3:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (420, 610))
-            else:
-                image = image.resize((300, 440), Image.ANTIALIAS)
-                bg.paste(image, (15, 5))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.render_group('black_magic', vertical=image_list)
 
     def portfolio(self, image_list, horizontal):
-        random.shuffle(image_list)
-        list1 = image_list[:4]
-        count = 1
-        bg = Image.new('RGB', (1200, 1200), (255, 255, 255))
-        bg.paste(horizontal, (0, 0))
-        for image in list1:
-            if count == 1:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (0, 600))
-            if count == 2:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (400, 600))
-            if count == 3:
-                image = image.resize((400, 600), Image.ANTIALIAS)
-                bg.paste(image, (800, 600))
-            count += 1
-        timestr = ImageProcess.timestamp(self)
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(args.output, filename)
-        if args.text:
-            bg = ImageProcess.draw_text(self, bg, args.text, 30, 'bottom left')
-        bg = ImageProcess.put_logo(self, bg, 'HauteBook', 30, 'bottom right')
-        bg.save(filename, quality=90, optimize=True)
+        self.render_group('portfolio', vertical=image_list, hero=[horizontal])
+
+def prepare_image(job):
+    """
+    Per image ingest steps run by the workers: decode, EXIF re-orientation,
+    thumbnail and face detection. Only the size and the largest face box
+    travel back, the pixels are decoded again where they are used.
+    """
+    img_path, detection_size = job
+    process = ImageProcess()
+    process.detection_size = detection_size
+    img = process.working_copy(img_path)
+    return img.size, process.largest_face(img)
 
 
 if __name__ == "__main__":
@@ -701,9 +515,14 @@ if __name__ == "__main__":
                         help='path to the destination folder where images are to be saved')
     parser.add_argument('-t', '--text', dest='text', type=str, action='store',
                         help='text that you want to display on final collages')
+    parser.add_argument('-d', '--detect-size', dest='detect_size', type=int,
+                        help='longest side of the working copy used for face detection (default: full resolution)')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1,
+                        help='number of worker processes used to ingest the images')
     args = parser.parse_args()
     # create an instance of defined class
     process = CollageCreation()
+    process.detection_size = args.detect_size
     # Run according to whether path is a file or a directory
 
     if not args.folder:
@@ -723,11 +542,16 @@ if __name__ == "__main__":
         print('Please provide different directory containing at-least 2 images.. ')
         exit(1)
     elif isdir(args.folder):
-        count, images = process.processdir(args.folder)
+        paths = process.list_images(args.folder)
+        count = len(paths)
+        # Detect the faces of every image in parallel
+        faces = ImageIngest(process, args.workers).map(prepare_image,
+                                                       [(img_path, args.detect_size) for img_path in paths])
+        results = list(zip(paths, faces))
         print('Number of Input Images: ' + str(count))
 
     # shuffle images if needed
-    random.shuffle(images)
+    random.shuffle(results)
     # image_list = []
     # list_hor = []
     # list_ver = []
@@ -745,19 +569,19 @@ if __name__ == "__main__":
     # print('Number of horizontal images: ', len(list_hor))
     # print('Number of vertical images: ', len(list_ver))
 
-    for img in images:
-        img.thumbnail((1800, 1800), Image.ANTIALIAS)
+    images = []
+    for img_path, (size, box) in results:
+        img = process.working_copy(img_path)
+        images.append(img)
         ar = img.size[0] / img.size[1]
         if ar < 1:
             vertical.append(img)
-            image1 = process.face_detection(img, 1200, 800)
-            horizontal.append(image1)
+            horizontal.append(process.face_crop(img, box, 1200, 800))
         else:
             horizontal.append(img)
-            image2 = process.face_detection(img, 800, 1200)
-            vertical.append(image2)
+            vertical.append(process.face_crop(img, box, 800, 1200))
     temp = images[0]
-    temp = process.face_detection(img, 1200, 600)
+    temp = process.face_crop(img, box, 1200, 600)
 
     # print(len(vertical), len(horizontal))
     # if(len(list_hor) < 2):
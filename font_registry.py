@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Process-wide registry of the bundled fonts and their text metrics
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import os
+import threading
+from PIL import ImageFont
+
+
+class FontRegistry():
+    """
+    Lazily initialised registry of the TrueType fonts found in Fonts/. A font
+    is chosen by name (file name with or without extension, any case), every
+    (file, size) face is parsed from disk once, and text extents are memoised
+    per (face, text) so captions and logos are measured once per run.
+    """
+
+    def __init__(self, directory='Fonts'):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._files = None
+        self._faces = {}
+        self._extents = {}
+
+    def available(self):
+        """
+        Returns the names of all the fonts which can be loaded from the directory
+        """
+        return sorted(set(os.path.splitext(fn)[0] for fn in self._index().values()))
+
+    def _index(self):
+        if self._files is None:
+            files = {}
+            for fn in os.listdir(self.directory):
+                if fn.lower().endswith(('.ttf', '.otf')):
+                    files[fn.lower()] = fn
+                    files[os.path.splitext(fn)[0].lower()] = fn
+            self._files = files
+        return self._files
+
+    def path(self, name):
+        """
+        Returns the path of the font file called name, e.g. 'arial' or 'Verdana.ttf'
+        """
+        fn = self._index().get(name.lower())
+        if fn is None:
+            raise ValueError('Font %r not found in %s' % (name, self.directory))
+        return os.path.join(self.directory, fn)
+
+    def font(self, name, size):
+        """
+        Returns the FreeTypeFont of the named font at size, loaded only once
+        """
+        path = self.path(name)
+        key = (path, size)
+        with self._lock:
+            face = self._faces.get(key)
+            if face is None:
+                face = self._faces[key] = ImageFont.truetype(path, size)
+        return face
+
+    def bbox(self, font, text):
+        """
+        Returns the (left, top, right, bottom) ink box of text drawn with font
+        at the origin, measured once per (font, text)
+        """
+        key = (font, text)
+        with self._lock:
+            box = self._extents.get(key)
+        if box is None:
+            box = font.getbbox(text)
+            with self._lock:
+                self._extents[key] = box
+        return box
+
+    def getsize(self, font, text):
+        """
+        Returns (width, height) of the ink of text drawn with font
+        """
+        left, top, right, bottom = self.bbox(font, text)
+        return right - left, bottom - top
+
+fonts = FontRegistry()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Lightweight handles to images which are decoded on demand
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from collections import OrderedDict
+from PIL import Image
+from face_metadata import FaceMetadata
+from image_pyramid import ImagePyramid
+import threading
+
+
+class ImageHandle():
+    """
+    Handle to a source image (or to an image derived from another handle) which
+    only decodes pixels when they are needed. At most `in_flight` handles hold
+    decoded pixels at any time, the least recently used one is released first,
+    so peak memory depends on the images in flight and not on the folder size.
+    Attribute access is forwarded to the decoded image, so a handle can be
+    resized, cropped or measured like a PIL image.
+    """
+
+    in_flight = 16
+    _loaded = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, process, path=None, max_size=None, faces=None, source=None, transform=None):
+        self.process = process
+        self.path = path
+        self.max_size = max_size
+        self.faces = faces
+        self.source = source
+        self.transform = transform
+        self.bounds = None
+        self._image = None
+        self._pyramid = None
+        self._header = None
+
+    def __repr__(self):
+        return 'ImageHandle(%r, loaded=%s)' % (self.path or self.source, self._image is not None)
+
+    @property
+    def header(self):
+        """
+        (width, height, orientation) read from the file header without decoding
+        """
+        if self._header is None:
+            self._header = self.process.read_header(self.path) if self.source is None else self.source.header
+        return self._header
+
+    @property
+    def dimensions(self):
+        """
+        (width, height) of the image, or of the untouched file when neither the
+        handle nor a thumbnail bound needs pixels; the aspect ratio is the same
+        """
+        if self._image is not None:
+            return self._image.size
+        if self.source is None and self.bounds is None:
+            return self.header[:2]
+        return self.decode().size
+
+    def decode(self):
+        """
+        Returns the PIL image, decoding it first if it is not in memory
+        """
+        with self._lock:
+            image = self._image
+            if image is not None:
+                self._loaded.move_to_end(id(self))
+                return image
+        if self.source is not None:
+            image = self.transform(self.source.decode())
+        else:
+            image = self.process.load_image(self.path, self.max_size)
+            if self.max_size is not None:
+                image.thumbnail((self.max_size, self.max_size), Image.LANCZOS)
+        if self.faces is not None:
+            self.faces.attach(image)
+        elif self.source is None:
+            self.faces = self.process.faces_of(image)
+        else:
+            self.faces = FaceMetadata.of(image)
+        if self.bounds is not None:
+            image.thumbnail(self.bounds, Image.LANCZOS)
+        with self._lock:
+            self._image = image
+            self._loaded[id(self)] = self
+            while len(self._loaded) > self.in_flight:
+                key, handle = self._loaded.popitem(last=False)
+                handle._image = None
+                handle._pyramid = None
+        return image
+
+    def release(self):
+        """
+        Drops the decoded pixels, they are decoded again on next use
+        """
+        with self._lock:
+            self._image = None
+            self._pyramid = None
+            self._loaded.pop(id(self), None)
+
+    def derive(self, transform):
+        """
+        Returns a handle to transform(image) which is computed on demand as well
+        """
+        return ImageHandle(self.process, source=self, transform=transform)
+
+    def thumbnail(self, size, resample=Image.LANCZOS):
+        """
+        Shrinks the image in place like Image.thumbnail. The bound is remembered
+        so the image is shrunk again if it has to be decoded once more.
+        """
+        if self.bounds is not None:
+            size = (min(size[0], self.bounds[0]), min(size[1], self.bounds[1]))
+        self.bounds = tuple(size)
+        self.decode().thumbnail(self.bounds, resample)
+        self._pyramid = None
+
+    def pyramid(self):
+        """
+        Returns the ImagePyramid of the decoded image. It is built lazily and
+        dropped together with the pixels.
+        """
+        image = self.decode()
+        pyramid = self._pyramid
+        if pyramid is None or pyramid.base is not image:
+            pyramid = self._pyramid = ImagePyramid(image)
+        return pyramid
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.decode(), name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
@@ -5,12 +5,32 @@ Script:     Abstract base class for image processing
 @author:    Pranav Gundewar
 """
 # Importing Libraries
+import logging
 import os
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 from PIL.ExifTags import TAGS
 import time
 import numpy as np
 import cv2
+from cascade_pool import cascades
+from font_registry import fonts
+from overlay import overlays
+from output_names import OutputNames
+from encoder_profiles import PROFILES
+from face_metadata import FaceMetadata
+from image_handle import ImageHandle
+from layout_solver import collage_geometry
+from tile_cache import TileCache
+from image_pyramid import ImagePyramid
+
+# Progress of the library code, main.py prints it
+log = logging.getLogger(__name__)
+
+# Minimum face size used when detecting faces at ingest
+FACE_MIN_SIZE = (90, 90)
+
+# Diagonal split masks shared by every collage, keyed by (canvas size, split line)
+_split_masks = {}
 
 
 class ImageProcess():
@@ -20,16 +40,46 @@ class ImageProcess():
 
     def __init__(self):
         self.extensions = ['.jpg', '.jpeg', '.png']
+        # Longest side of the working copy used for face detection, None for full resolution
+        self.detection_size = None
+        # Optional MetadataCache consulted before decoding or detecting anything
+        self.cache = None
+        # Resized tiles shared by every layout of the run
+        self.tile_cache = TileCache()
+        # Text colour: 'region' picks one colour for the whole caption, 'glyph'
+        # one per character, for captions over busy or graded backgrounds
+        self.text_colour = 'region'
+        # Fonts of Fonts/ used for the caption and the logo, by name
+        self.caption_font = 'arial'
+        self.logo_font = 'Verdana'
+        # Image logo (e.g. Logo/test1.png) stamped instead of the text logo, when set
+        self.logo_image = None
+        # Captions put on the collages, every collage is saved once per caption
+        self.captions = []
+        # Optional LayerStore keeping the text-free composites for re-captioning
+        self.layers = None
+        # Optional EncodePipeline saving the collages in the background
+        self.encoder = None
+        # Collision-free names of the collages written by this run
+        self.names = None
+        # EncoderProfile the collages are saved with
+        self.profile = PROFILES['default']
+        # Largest file size in bytes of a collage, None for no limit, with the
+        # number of threads trying qualities in parallel and the stats per file
+        self.max_bytes = None
+        self.budget_workers = 1
+        self.budget_stats = []
+        # Longest sides of the renditions saved of every collage, None for a
+        # single one at layout size. Collages are composed once at the largest.
+        self.renditions = None
         # self.output_width = 1200
         # self.output_height = 800
 
-    def processdir(self, filename):
+    def list_images(self, filename):
         """
-                Creates the list of all the files with given extensions
-                and returns list and filecount
+                Returns the paths of all the files with given extensions
         """
         filecount = 0  # Number of files successfully updated
-        count = 0   # Number of images successfully updated
         files = []
         images = []
         for fn in os.listdir(filename):
@@ -41,47 +91,159 @@ class ImageProcess():
             for ext in self.extensions:
                 if os.path.splitext(fn)[1].lower() == ext:
                     images.append(fn)
-                    count += 1
+        return images
 
+    def processdir(self, filename, max_size=None):
+        """
+                Creates the list of all the files with given extensions
+                and returns list and filecount. max_size is the largest
+                size (longest side) any layout needs from a source image.
+        """
+        images = self.list_images(filename)
         image_list = []
         for img_path in images:
-            img = Image.open(img_path)
-            img = self.reorient_image(img)
-            # img.thumbnail([2400, 2400], Image.ANTIALIAS)
-            image_list.append(img)
-        return count, image_list
+            image_list.append(self.load_image(img_path, max_size))
+        return len(images), image_list
+
+    def iter_images(self, paths, max_size=None, faces=None):
+        """
+        Yields a lightweight ImageHandle per path instead of opening every image
+        at once. Pixels are decoded on demand, shrunk to max_size, and can be
+        released as soon as the tiles of all layouts have been produced.
+        faces optionally gives precomputed FaceMetadata per path.
+        """
+        for i, img_path in enumerate(paths):
+            yield ImageHandle(self, img_path, max_size, faces[i] if faces is not None else None)
+
+    def dimensions(self, image):
+        """
+        Returns (width, height) of an image or handle, from the file header when
+        the handle has not been decoded yet
+        """
+        if isinstance(image, ImageHandle):
+            return image.dimensions
+        return image.size
+
+    def pixels(self, image):
+        """
+        Returns the PIL image behind an ImageHandle, or the image itself
+        """
+        if isinstance(image, ImageHandle):
+            return image.decode()
+        return image
+
+    def load_image(self, img_path, max_size=None):
+        """
+        Opens a single image, consulting the metadata cache, and re-orients it.
+        When max_size (longest side in pixels) is given, JPEGs are decoded directly
+        at the nearest 1/2, 1/4 or 1/8 DCT scale which still covers max_size.
+        """
+        img = Image.open(img_path)
+        key, entry = self.cache.lookup(img_path) if self.cache else (None, None)
+        if entry is not None and entry['size'] != self.oriented_size(img.size, entry['orientation']):
+            # Stale entry, the file header disagrees with the cached dimensions
+            self.cache.invalidate(key)
+            key, entry = self.cache.lookup(img_path)
+        if entry is not None:
+            orientation = entry['orientation']
+        else:
+            try:
+                orientation = self.exif_orientation(img)
+            except Exception:
+                log.info('Input image does not have metadata. Moving on..')
+                orientation = 1
+            if key is not None:
+                self.cache.store(key, size=self.oriented_size(img.size, orientation), orientation=orientation)
+        if max_size is not None:
+            self.draft(img, max_size)
+        img = self.orient(img, orientation)
+        if key is not None:
+            img.info['cache_key'] = key
+            faces = entry['faces'] if entry is not None else None
+            if faces is not None and faces['min_size'] == list(FACE_MIN_SIZE) \
+                    and faces['detection_size'] == self.detection_size:
+                FaceMetadata(faces['size'], faces['boxes']).attach(img)
+        # img.thumbnail([2400, 2400], Image.ANTIALIAS)
+        return img
+
+    def draft(self, image, max_size):
+        """
+        Asks the decoder for the smallest DCT scaled version of the image which
+        still covers max_size on its longest side. Only JPEG decoders support
+        draft mode, other formats are left untouched.
+        """
+        width, height = image.size
+        scale = max_size / max(width, height)
+        if scale < 1:
+            image.draft(image.mode, (max(1, int(width * scale)), max(1, int(height * scale))))
+        return image
+
+    def read_header(self, img_path):
+        """
+        Returns (width, height, orientation) of an image read from the file header
+        only, width and height are given after EXIF rotation. No pixels are decoded.
+        """
+        img = Image.open(img_path)
+        try:
+            try:
+                orientation = self.exif_orientation(img)
+            except Exception:
+                orientation = 1
+            width, height = self.oriented_size(img.size, orientation)
+        finally:
+            img.close()
+        return width, height, orientation
+
+    def oriented_size(self, size, orientation):
+        """
+        Returns the size an image will have after applying the EXIF orientation
+        """
+        if orientation in (5, 6, 7, 8):
+            return (size[1], size[0])
+        return tuple(size)
+
+    def exif_orientation(self, image):
+        """
+        Returns the EXIF orientation tag of the image, 1 if it has none
+        """
+        if hasattr(image, '_getexif'):  # only present in JPEGs
+            for orientation in TAGS.keys():
+                if TAGS[orientation] == 'Orientation':
+                    break
+            e = image._getexif()       # returns None if no EXIF data
+            if e is not None:
+                return dict(e.items()).get(orientation, 1)
+        return 1
+
+    def orient(self, image, orientation):
+        """
+        Transposes the image according to given EXIF orientation
+        """
+        # Make changes in the image according to the orientation
+        if orientation == 2:
+            image = image.transpose(Image.FLIP_LEFT_RIGHT)
+        elif orientation == 3:
+            image = image.transpose(Image.ROTATE_180)
+        elif orientation == 4:
+            image = image.transpose(Image.FLIP_TOP_BOTTOM)
+        elif orientation == 5:
+            image = image.transpose(Image.ROTATE_90).transpose(Image.FLIP_TOP_BOTTOM)
+        elif orientation == 6:
+            image = image.transpose(Image.ROTATE_270)
+        elif orientation == 7:
+            image = image.transpose(Image.ROTATE_270).transpose(Image.FLIP_TOP_BOTTOM)
+        elif orientation == 8:
+            image = image.transpose(Image.ROTATE_90)
+        return image
 
     def reorient_image(self, image):
         """
         Re-orient image to required orientation to create collages
         """
         try:
-            if hasattr(image, '_getexif'):  # only present in JPEGs
-                for orientation in TAGS.keys():
-                    if TAGS[orientation] == 'Orientation':
-                        break
-                e = image._getexif()       # returns None if no EXIF data
-                if e is not None:
-                    exif = dict(e.items())
-                    orientation = exif[orientation]
-                    # Make changes in the image according to the orientation
-                    if orientation == 2:
-                        image = image.transpose(Image.FLIP_LEFT_RIGHT)
-                    elif orientation == 3:
-                        image = image.transpose(Image.ROTATE_180)
-                    elif orientation == 4:
-                        image = image.transpose(Image.FLIP_TOP_BOTTOM)
-                    elif orientation == 5:
-                        image = image.transpose(Image.ROTATE_90).transpose(Image.FLIP_TOP_BOTTOM)
-                    elif orientation == 6:
-                        image = image.transpose(Image.ROTATE_270)
-                    elif orientation == 7:
-                        image = image.transpose(Image.ROTATE_270).transpose(Image.FLIP_TOP_BOTTOM)
-                    elif orientation == 8:
-                        image = image.transpose(Image.ROTATE_90)
+            image = self.orient(image, self.exif_orientation(image))
         except Exception:
-            print('Input image does not have metadata. Moving on..')
-            pass
+            log.info('Input image does not have metadata. Moving on..')
         return image
 
     def timestamp(self):
@@ -90,10 +252,10 @@ class ImageProcess():
         """
         now = time.time()
         localtime = time.localtime(now)
-        milliseconds = '%02d' % int((now - int(now)) * 1000)
+        milliseconds = '%03d' % int((now - int(now)) * 1000)
         return time.strftime('%Y%m%d-%H%M%S', localtime) + milliseconds
 
-    def draw_text(self, img, text, font_size, location):
+    def draw_text(self, img, text, font_size, location, margin=20):
         """
         Draw lines, points, ellipses, rectangles, shapes and text.
         Parameters: text - The text that you would like to print on an image
@@ -102,39 +264,54 @@ class ImageProcess():
                     location - tuple(width, height) where you would like to print on the image
         """
 
-        font = ImageFont.truetype("Fonts/arial.ttf", font_size)
+        font = fonts.font(self.caption_font, font_size)
         width, height = img.size
-        img_draw = ImageDraw.Draw(img)
-        line_height = font.getsize(text)[1]
-        line_width = font.getsize(text)[0]
-        margin = 20
-        color = self.color_chooser(img, line_height, line_width, location)
+        line_width, line_height = fonts.getsize(font, text)
         if location == 'bottom left':
             coord = (margin, height - line_height - margin)
         elif location == 'top right':
             coord = (width - line_width - margin, margin)
         else:
             coord = (width - line_width - margin, height - line_height - margin)
-        img_draw.text(coord, text, fill=color, font=font)
-        return img
+        if self.text_colour == 'glyph':
+            return self.draw_glyphs(img, coord, text, font)
+        color = self.color_chooser(img, line_height, line_width, location)
+        return overlays.stamp(img, overlays.text(text, font, color), coord)
 
-    def put_logo(self, img, text, font_size, location):
+    def put_logo(self, img, text, font_size, location, margin=20):
         """
         This function allows to put transparent logo on the image
         """
-        font = ImageFont.truetype("Fonts/Verdana.ttf", font_size)
+        font = fonts.font(self.logo_font, font_size)
         width, height = img.size
-        img_draw = ImageDraw.Draw(img)
-        line_height = font.getsize(text)[1]
-        line_width = font.getsize(text)[0]
-        margin = 20
-        color = self.color_chooser(img, line_height, line_width, location)
+        line_width, line_height = fonts.getsize(font, text)
+        if self.logo_image:
+            # image logo as tall as the text logo would be
+            sprite = overlays.image(self.logo_image, line_height)
+            coord = (width - sprite.size[0] - margin, height - sprite.size[1] - margin)
+            return overlays.stamp(img, sprite, coord)
         coord = (width - line_width - margin, height - line_height - margin)
-        if color == 'black':
-            img_draw.text(coord, text, fill=color, font=font)
-        else:
-            img_draw.text(coord, text, fill=color, font=font)
+        if self.text_colour == 'glyph':
+            return self.draw_glyphs(img, coord, text, font)
+        color = self.color_chooser(img, line_height, line_width, location)
+        return overlays.stamp(img, overlays.text(text, font, color), coord)
 
+    def draw_glyphs(self, img, coord, text, font):
+        """
+        Draws text character by character, each one in the colour contrasting
+        with the background right under it
+        """
+        x, y = coord
+        # coord is the top left corner of the ink of the whole line
+        line_left, line_top, line_right, line_bottom = fonts.bbox(font, text)
+        for i, char in enumerate(text):
+            if char.isspace():
+                continue
+            left, top, right, bottom = fonts.bbox(font, char)
+            origin = x - line_left + int(round(font.getlength(text[:i])))
+            color = self.contrast_colour(img, (origin + left, y, max(origin + right, origin + left + 1),
+                                               y + line_bottom - line_top))
+            overlays.stamp(img, overlays.text(char, font, color), (origin + left, y - line_top + top))
         return img
 
     def brightness(self, pixel):
@@ -155,209 +332,234 @@ class ImageProcess():
         Returns the color of contrast text
         """
         width, height = image.size
-        f = 0
-        t = 0
         if location == 'bottom left':
-            for i in range(line_width):
-                for j in range(height - line_height, height):
-                    pixel = image.getpixel((i, j))
-                    b = self.contrast(pixel)
-                    if b is False:
-                        f += 1
-                    else:
-                        t += 1
+            box = (0, height - line_height, line_width, height)
         elif location == 'top right':
-            for i in range(width - line_width, width):
-                for j in range(line_height):
-                    pixel = image.getpixel((i, j))
-                    b = self.contrast(pixel)
-                    if b is False:
-                        f += 1
-                    else:
-                        t += 1
+            box = (width - line_width, 0, width, line_height)
         else:
-            for i in range(width - line_width, width):
-                for j in range(height - line_height, height):
-                    pixel = image.getpixel((i, j))
-                    b = self.contrast(pixel)
-                    if b is False:
-                        f += 1
-                    else:
-                        t += 1
-        if f > t:
+            box = (width - line_width, height - line_height, width, height)
+        return self.contrast_colour(image, box)
+
+    def contrast_colour(self, image, box):
+        """
+        Returns 'white' when most pixels of the box are dark, i.e. contrast() is
+        False for them, and 'black' otherwise. Counts over the whole region at
+        once instead of calling getpixel() for every pixel.
+        """
+        region = np.asarray(image.crop(box).convert('RGB'), dtype=np.int32)
+        # brightness(pixel) > 123  <=>  299 R + 587 G + 114 B > 123000
+        luma = region[..., 0] * 299 + region[..., 1] * 587 + region[..., 2] * 114
+        bright = int(np.count_nonzero(luma > 123000))
+        if luma.size - bright > bright:
             return 'white'
         else:
             return 'black'
 
-    def image_location(self, image, place, x):
+    def split_mask(self, size, a, b, c):
+        """
+        Returns an 'L' mask of given size which is white wherever a * x + b * y <= c.
+        Masks are cached per (canvas size, split line) so repeated shuffles reuse them.
+        """
+        key = (tuple(size), a, b, c)
+        mask = _split_masks.get(key)
+        if mask is None:
+            xs = np.arange(size[0])
+            ys = np.arange(size[1])[:, None]
+            mask = Image.fromarray(np.where(a * xs + b * ys <= c, 255, 0).astype(np.uint8))
+            _split_masks[key] = mask
+        return mask
+
+    def diagonal_composite(self, image1, image2, size, a, b, c):
+        """
+        Composites image1 on the side of the line a * x + b * y <= c and image2 on the other side
+        """
+        mask = self.split_mask(size, a, b, c)
+        return Image.composite(image1.convert('RGB'), image2.convert('RGB'), mask)
+
+    def image_location(self, image, place, x, scale=1.0):
+        """
+        Moves the face at x of a 1200x800 layout image to the given side,
+        scale is the size of image relative to the layout
+        """
+        s = lambda d: int(round(d * scale))
         if place == 'left':
-            image = image.crop((x - 200, 0, image.size[0], image.size[1]))
-            bg = Image.new('RGB', (1200, 800), (255, 255, 255))
+            image = image.crop((x - s(200), 0, image.size[0], image.size[1]))
+            bg = Image.new('RGB', (s(1200), s(800)), (255, 255, 255))
             bg.paste(image, (0, 0))
             # bg.show()
         else:
-            image = image.crop((x - 300, 0, x + 400, image.size[1]))
-            bg = Image.new('RGB', (1200, 800), (255, 255, 255))
-            bg.paste(image, (500, 0))
+            image = image.crop((x - s(300), 0, x + s(400), image.size[1]))
+            bg = Image.new('RGB', (s(1200), s(800)), (255, 255, 255))
+            bg.paste(image, (s(500), 0))
             # bg.show()
         return bg
 
-    def face_location(self, image, position):
+    def detect_faces(self, image, min_size=FACE_MIN_SIZE, max_side=None):
         """
-        This function finds the location of face in an image which will help
-        us determine cropping conditoin
+        Runs the frontal face cascade once on the image and attaches the face boxes
+        to it as FaceMetadata, every later crop is derived from these boxes.
+        When max_side (or self.detection_size) is set the cascade runs on a copy whose
+        longest side is at most max_side, with min_size rescaled to match, and the
+        boxes are projected back to the coordinates of the image.
         """
-        point1 = (500, 600)
-        point2 = (500, 200)
-        point3 = (700, 600)
-        point4 = (700, 200)
-        p = (0, 0)
-        face_cascade = cv2.CascadeClassifier('Data/haarcascade_frontalface_default.xml')
-        image = np.array(image)
-        # Convert RGB to BGR
-        image = image[:, :, ::-1].copy()
-        grayImage = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if max_side is None:
+            max_side = self.detection_size
+        params = {'min_size': list(min_size), 'detection_size': max_side}
+        face_cascade = cascades.get('haarcascade_frontalface_default')
+        grayImage = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2GRAY)
+        height, width = grayImage.shape
+        scale = 1.0
+        if max_side and max(width, height) > max_side:
+            scale = max_side / max(width, height)
+            grayImage = cv2.resize(grayImage, (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+                                   interpolation=cv2.INTER_AREA)
+            min_size = (max(1, int(round(min_size[0] * scale))), max(1, int(round(min_size[1] * scale))))
 
         faces = face_cascade.detectMultiScale(grayImage,
                                               scaleFactor=1.1,
                                               minNeighbors=5,
-                                              minSize=(80, 80),
+                                              minSize=min_size,
                                               flags=cv2.CASCADE_SCALE_IMAGE)
+        faces = FaceMetadata((grayImage.shape[1], grayImage.shape[0]), faces)
+        if scale != 1.0:
+            faces = FaceMetadata(image.size, faces.scaled(image.size))
+        faces.attach(image)
+        key = image.info.get('cache_key')
+        if key is not None and self.cache is not None:
+            params.update(size=list(faces.size), boxes=[list(box) for box in faces.boxes])
+            self.cache.store(key, faces=params, colour=self.dominant_colour(image))
+        return faces
+
+    def dominant_colour(self, image):
+        """
+        Returns the most common colour of a small palette reduced copy of the image
+        """
+        small = image.resize((64, 64), Image.BOX).convert('RGB').quantize(8)
+        count, index = max(small.getcolors())
+        palette = small.getpalette()
+        return tuple(palette[index * 3:index * 3 + 3])
 
-        if len(faces) == 0:
-            print("No faces found")
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(image)
-            return image
-        else:
-            # print("Number of faces detected: " + str(faces.shape[0]))
-            m = []
-            for i in range(len(faces)):
-                m.append(faces[i][2])
-            n = np.argmax(m)
-            array = faces[n]
-            # print(array)
-            box = [array]
-            for (x, y, w, h) in box:
-                # cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                newpoint1 = (x + w, y)
-                newpoint2 = (x + w, y + h)
-                newpoint3 = (x, y + h)
-                newpoint4 = (x, y)
-                op1 = tuple(x - y for x, y in zip(point1, newpoint1))
-                op2 = tuple(x - y for x, y in zip(point2, newpoint2))
-                op3 = tuple(x - y for x, y in zip(newpoint3, point3))
-                op4 = tuple(x - y for x, y in zip(newpoint4, point4))
-                if op1 > p and op2 > p:
-                    # print('Face Lies in left zone')
-                    location = 'left'
-                elif op3 > p and op4 > p:
-                    # print('Face lies in the right zone')
-                    location = 'right'
-                else:
-                    location = 'middle'
-                    # print('Face lies in middle')
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                image = Image.fromarray(image)
-                if location != 'right' and position == 'right':
-                    image = self.image_location(image, 'right', x)
-                elif location != 'left' and position == 'left':
-                    image = self.image_location(image, 'left', x)
-
-                return image
+    def faces_of(self, image):
+        """
+        Returns the face metadata of the image, detecting faces only if it has none yet
+        """
+        faces = FaceMetadata.of(image)
+        if faces is None:
+            faces = self.detect_faces(image)
+        return faces
 
-    def face_detection(self, image, output_width, output_height):
+    def face_location(self, image, position, scale=1.0):
         """
         This function finds the location of face in an image which will help
-        us determine cropping conditoin
+        us determine cropping conditoin. scale is the size of image relative
+        to the 1200x800 layout.
         """
-        face_cascade = cv2.CascadeClassifier('Data/haarcascade_frontalface_default.xml')
-        image = np.array(image)
-        # Convert RGB to BGR
-        image = image[:, :, ::-1]
-        grayImage = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        point1 = (500 * scale, 600 * scale)
+        point2 = (500 * scale, 200 * scale)
+        point3 = (700 * scale, 600 * scale)
+        point4 = (700 * scale, 200 * scale)
+        p = (0, 0)
+        box = self.faces_of(image).largest(image.size)
 
-        faces = face_cascade.detectMultiScale(grayImage,
-                                              scaleFactor=1.1,
-                                              minNeighbors=5,
-                                              minSize=(90, 90),
-                                              flags=cv2.CASCADE_SCALE_IMAGE)
+        if box is None:
+            log.info('No faces found')
+            return image
 
-        if len(faces) == 0:
-            image = self.image_crop(image, 200, 0, 150, 150, output_width, output_height)
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(image)
+        x, y, w, h = box
+        newpoint1 = (x + w, y)
+        newpoint2 = (x + w, y + h)
+        newpoint3 = (x, y + h)
+        newpoint4 = (x, y)
+        op1 = tuple(a - b for a, b in zip(point1, newpoint1))
+        op2 = tuple(a - b for a, b in zip(point2, newpoint2))
+        op3 = tuple(a - b for a, b in zip(newpoint3, point3))
+        op4 = tuple(a - b for a, b in zip(newpoint4, point4))
+        if op1 > p and op2 > p:
+            # print('Face Lies in left zone')
+            location = 'left'
+        elif op3 > p and op4 > p:
+            # print('Face lies in the right zone')
+            location = 'right'
         else:
-            m = []
-            for i in range(len(faces)):
-                m.append(faces[i][2])
-            n = np.argmax(m)
-            array = faces[n]
-            box = [array]
-            for (x, y, w, h) in box:
-                image = self.image_crop(image, x, y, w, h, output_width, output_height)
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                image = Image.fromarray(image)
+            location = 'middle'
+            # print('Face lies in middle')
+        if location != 'right' and position == 'right':
+            image = self.image_location(image, 'right', x, scale)
+        elif location != 'left' and position == 'left':
+            image = self.image_location(image, 'left', x, scale)
 
         return image
 
-    def image_crop(self, image, x, y, w, h, output_width, output_height):
-        height, width = image.shape[:2]
+    def face_detection(self, image, output_width, output_height):
+        """
+        This function finds the location of face in an image which will help
+        us determine cropping conditoin
+        """
+        faces = self.faces_of(image)
+        box = faces.largest(image.size)
+        if box is None:
+            box = (200, 0, 150, 150)
+        x, y, w, h = box
+        width, height = image.size
+        x1, y1 = self.crop_origin(width, height, x, y, w, h, output_width, output_height)
+        crop = Image.fromarray(np.array(image)[y1:y1 + output_height, x1:x1 + output_width])
+        # Keep the face boxes with the crop so that later layouts do not detect again
+        faces = FaceMetadata(image.size, faces.scaled(image.size))
+        faces.cropped((x1, y1, x1 + crop.size[0], y1 + crop.size[1])).attach(crop)
+        return crop
+
+    def crop_origin(self, width, height, x, y, w, h, output_width, output_height):
+        """
+        Returns the top left corner of the output_width x output_height crop
+        centred on the face box (x, y, w, h) of a width x height image
+        """
         newWidth = int((output_width - w) / 2)
         newHeight = int((output_height - h) / 2)
         if x - newWidth > 0:
             if x - newWidth + output_width < width:
                 x1 = x - newWidth
-                if y - newHeight > 0:
-                    if y - newHeight + output_height < height:
-                        y1 = y - newHeight
-                    else:
-                        y1 = height - output_height
-                else:
-                    y1 = 0
             else:
                 x1 = width - output_width
-                if y - newHeight > 0:
-                    if y - newHeight + output_height < height:
-                        y1 = y - newHeight
-                    else:
-                        y1 = height - output_height
-                else:
-                    y1 = 0
         else:
             x1 = 0
-            if y - newHeight > 0:
-                if y - newHeight + output_height < height:
-                    y1 = y - newHeight
-                else:
-                    y1 = height - output_height
+        if y - newHeight > 0:
+            if y - newHeight + output_height < height:
+                y1 = y - newHeight
             else:
-                y1 = 0
+                y1 = height - output_height
+        else:
+            y1 = 0
+        return x1, y1
 
+    def image_crop(self, image, x, y, w, h, output_width, output_height):
+        height, width = image.shape[:2]
+        x1, y1 = self.crop_origin(width, height, x, y, w, h, output_width, output_height)
         image = image[y1:y1 + output_height, x1:x1 + output_width]
         # image = image.crop((x1, y1, x1 + output_width, y1 + output_height))
         return image
 
-    def collage_creation(self, coefs_lines, collage_image, width, init_height):
+    def collage_creation(self, images, cells, collage_image):
+        """
+        Render phase: resamples every source once, straight to the size of its
+        cell, through the tile cache, and pastes it. The source images
+        themselves are never modified.
+        Resample count and pixels processed are kept in self.render_stats.
+        """
         margin_size = 0
-        y = 0
-        for coef, images in coefs_lines:
-            if images:
-                x = 0
-                for img in images:
-                        # if need to enlarge an image - use `resize`, otherwise use `thumbnail`, it's faster
-                    k = (init_height / coef) / img.size[1]
-                    if k > 1:
-                        img = img.resize((int(img.size[0] * k), int(img.size[1] * k)), Image.ANTIALIAS)
-                    else:
-                        img.thumbnail((int(width / coef), int(init_height / coef)), Image.ANTIALIAS)
-                    w, h = img.size
-                    if(w + x > width):
-                        if (int(width - x) > 0):
-                            img = img.resize((int(width - x), h), Image.ANTIALIAS)
-                    collage_image.paste(img, (int(x), int(y)))
-                    x += img.size[0] + margin_size
-                y += int(init_height / coef) + margin_size
+        resamples = 0
+        pixels_read = 0
+        for index, (x, y, w, h) in cells:
+            misses = self.tile_cache.misses
+            img = self.tile_cache.tile(images[index], (w, h))
+            if self.tile_cache.misses != misses:
+                resamples += 1
+                width, height = self.dimensions(images[index])
+                pixels_read += width * height
+            collage_image.paste(img, (x, y))
+        pixels_written = sum(w * h for index, (x, y, w, h) in cells)
+        self.render_stats = {'resamples': resamples, 'pixels_read': pixels_read, 'pixels_written': pixels_written}
+        log.info('Rendered %d tiles with %d resamples, %.1f MP read, %.1f MP written',
+                 len(cells), resamples, pixels_read / 1e6, pixels_written / 1e6)
         w, h = collage_image.size
         collage = Image.new('RGB', (w + margin_size, h + margin_size), (0, 0, 0))
         collage.paste(collage_image, (margin_size, margin_size))
@@ -368,54 +570,156 @@ class ImageProcess():
         """
         Make a collage image with a width equal to `width` from `images` and save to `filename`.
         """
+        collage = self.justified_collage(images, width, init_height)
+        if collage is None:
+            return False
+        collage_image, cells, scale = collage
+        self.save_collage(collage_image, caption=False, scale=scale)
+        return True
+
+    def justified_collage(self, images, width, init_height):
+        """
+        Composes the justified rows collage of `images`, `width` pixels wide
+        at layout size, without saving it. Returns (composite, cells, scale),
+        cells being the (image index, (x, y, w, h)) rectangles of the
+        composite, or None when no arrangement has a height.
+        """
         margin_size = 0
-        # run until a suitable arrangement of images is found
-        while True:
-            # copy images to images_list
-            images_list = images[:]
-            coefs_lines = []
-            images_line = []
-            x = 0
-            while images_list:
-                # get first image and resize to `init_height`
-                img = images_list.pop(0)
-                img.thumbnail((width, init_height), Image.ANTIALIAS)
-                # when `x` will go beyond the `width`, start the next line
-                if x > width:
-                    coefs_lines.append((float(x) / width, images_line))
-                    images_line = []
-                    x = 0
-                x += img.size[0] + margin_size
-                images_line.append(img)
-            # finally add the last line with images
-            coefs_lines.append((float(x) / width, images_line))
-
-            # compact the lines, by reducing the `init_height`, if any with one or less images
-            if len(coefs_lines) <= 1:
-                break
-            if any(map(lambda c: len(c[1]) <= 1, coefs_lines)):
-                # reduce `init_height`
-                init_height -= 10
-            else:
-                break
-        print('Suitable arrangement of images has been found out..')
-
-        # get output height
-        out_height = 0
-        for coef, imgs_line in coefs_lines:
-            if imgs_line:
-                out_height += int(init_height / coef) + margin_size
+        # geometry phase: row and cell rectangles from image sizes only
+        sizes = [self.dimensions(img) for img in images]
+        out_height, cells = collage_geometry(sizes, width, init_height, margin_size)
+        log.info('Suitable arrangement of images has been found out..')
+
         if not out_height:
-            print('Height of collage could not be 0!')
-            return False
+            log.warning('Height of collage could not be 0!')
+            return None
+
+        # compose at the largest rendition, the others are reduced from it
+        scale = self.render_scale((width, out_height))
+        if scale != 1.0:
+            width = int(round(width * scale))
+            out_height, cells = collage_geometry(sizes, width, init_height * scale, margin_size)
 
         collage_image = Image.new('RGB', (width, int(out_height)), (0, 0, 0))
-        print('Dimension of background canvas has been obtained..')
-        collage_image = self.collage_creation(coefs_lines, collage_image, width, init_height)
-        # Putting timestamp to the image output filename
-        timestr = self.timestamp()
-        filename = 'collage' + str(timestr) + '.jpg'
-        filename = os.path.join(self.output, filename)
-        collage_image = self.put_logo(collage_image, 'HauteBook', 30, 'bottom right')
-        collage_image.save(filename, quality=90, optimize=True)
-        return True
+        log.info('Dimension of background canvas has been obtained..')
+        collage_image = self.collage_creation(images, cells, collage_image)
+        return collage_image, cells, scale
+
+    def render_scale(self, size):
+        """
+        Returns the scale at which a layout of the given size is composed: so
+        that its longest side is the largest rendition, or 1 without renditions
+        """
+        if not self.renditions:
+            return 1.0
+        return float(max(self.renditions)) / max(size)
+
+    def save_collage(self, bg, text_location='bottom left', logo=True, caption=True, scale=1.0):
+        """
+        Shared ending of every collage: the text-free composite goes to the
+        layer store, when there is one, and is then finished for every caption.
+        scale is the size of bg relative to its layout.
+        Returns the paths of the saved collages.
+        """
+        if self.layers is not None:
+            self.layers.add(bg, text_location, logo, caption, scale)
+        return self.finish_collage(bg, text_location, logo, caption, scale)
+
+    def finish_collage(self, bg, text_location='bottom left', logo=True, caption=True, scale=1.0):
+        """
+        Saves every finished image of a composite with the encoder profile,
+        the captions and renditions of one collage sharing a sequence number.
+        """
+        # one sequence number per collage, captioned variants share it
+        names = self.output_names()
+        stem = names.name(ext='')
+        filenames = []
+        for suffix, text, img, factor in self.finished_images(bg, text_location, logo, caption, scale):
+            filename = stem + suffix + self.profile.ext
+            if self.encoder is not None:
+                self.encoder.submit(self.save_image, img, filename, suffix=suffix)
+            else:
+                filename = self.save_image(img, filename, suffix)
+            filenames.append(filename)
+        return filenames
+
+    def finished_images(self, bg, text_location='bottom left', logo=True, caption=True, scale=1.0):
+        """
+        Puts caption and logo on every rendition of a composite, once per
+        caption, and returns (name suffix, caption, image, size relative to the
+        layout) for each. Text size and margins follow the size of each
+        rendition relative to the layout. Nothing is written.
+        """
+        captions = self.captions if caption and self.captions else [None]
+        renditions = self.rendition_set(bg, scale)
+        finished = []
+        for i, text in enumerate(captions):
+            suffix = '-%d' % (i + 1) if len(captions) > 1 else ''
+            for size_suffix, img, factor in renditions:
+                img = img.copy() if len(captions) > 1 else img
+                font_size = max(1, int(round(30 * factor)))
+                margin = int(round(20 * factor))
+                if text:
+                    img = self.draw_text(img, text, font_size, text_location, margin)
+                if logo:
+                    img = self.put_logo(img, 'HauteBook', font_size, 'bottom right', margin)
+                finished.append((suffix + size_suffix, text, img, factor))
+        return finished
+
+    def rendition_set(self, bg, scale=1.0):
+        """
+        Returns (filename suffix, image, size relative to the layout) for every
+        rendition of a composite made at `scale` times its layout size. They
+        are reduced from the composite through one shared pyramid, so each
+        smaller rendition starts from the reduction of the larger one. Sides
+        larger than the composite are capped, nothing is upscaled.
+        """
+        if not self.renditions:
+            return [('', bg, scale)]
+        longest = max(bg.size)
+        pyramid = ImagePyramid(bg)
+        renditions = []
+        for side in sorted(set(min(side, longest) for side in self.renditions), reverse=True):
+            if side == longest:
+                img = bg
+            else:
+                img = pyramid.resize(tuple(max(1, int(round(d * float(side) / longest))) for d in bg.size))
+            renditions.append(('-%dpx' % side, img, scale * float(side) / longest))
+        return renditions
+
+    def save_image(self, image, filename, suffix=''):
+        """
+        Encodes a finished collage with the encoder profile, within max_bytes
+        when it is set, and publishes it as filename, or as the next free name
+        ending in suffix. Returns the final path.
+        """
+        names = self.output_names()
+        if self.max_bytes is None:
+            return names.save(image, filename, suffix, **self.profile.params)
+        data, stats = self.profile.encode_within(image, self.max_bytes, self.budget_workers)
+        stats['filename'] = filename
+        self.budget_stats.append(stats)
+        if not stats['fits']:
+            log.warning('%s does not fit into %d bytes even at quality %d (%d bytes)',
+                        os.path.basename(filename), self.max_bytes, stats['quality'], stats['bytes'])
+        return names.write(data, filename, suffix)
+
+    def output_names(self):
+        """
+        Returns the OutputNames of the output directory, created on first use
+        """
+        if self.names is None or self.names.directory != self.output:
+            self.names = OutputNames(self.output)
+        return self.names
+
+    def recaption(self):
+        """
+        Finishes every composite of the layer store again with the current
+        captions, without decoding or compositing any photo
+        """
+        filenames = []
+        for entry in self.layers.load():
+            bg = self.layers.base(entry)
+            filenames += self.finish_collage(bg, entry['text_location'], entry['logo'], entry['caption'],
+                                             entry.get('scale', 1.0))
+        return filenames
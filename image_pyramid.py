@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Power-of-two image pyramid for fast resampling to any size
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from PIL import Image
+
+# Modes Image.reduce cannot average, with the mode the pyramid works in instead
+_REDUCE_MODES = {'1': 'L', 'P': 'RGB', 'PA': 'RGBA', 'I;16': 'I', 'I;16L': 'I', 'I;16B': 'I', 'I;16N': 'I'}
+
+
+class ImagePyramid():
+    """
+    Power-of-two pyramid of an image, levels[0] is the image itself and every
+    further level is the previous one halved with Image.reduce (2x2 box
+    average). Levels are only built when a resize needs them, all of them
+    together take at most a third more memory than the image. Palette, bilevel
+    and 16 bit images are converted first, as reduce cannot average them.
+    """
+
+    def __init__(self, image):
+        mode = _REDUCE_MODES.get(image.mode)
+        if image.mode == 'P' and 'transparency' in image.info:
+            mode = 'RGBA'
+        if mode is not None:
+            image = image.convert(mode)
+        self.base = image
+        self.levels = [image]
+
+    def level(self, size, box=None):
+        """
+        Returns the smallest level which is still at least `size` over the
+        (base image coordinates) box, or over the whole image
+        """
+        width, height = self.base.size
+        box_width, box_height = (box[2] - box[0], box[3] - box[1]) if box is not None else (width, height)
+        i = 0
+        while True:
+            current = self.levels[i]
+            # the next level halves the box as well, stop if it would undershoot
+            if box_width * ((current.size[0] + 1) // 2) < size[0] * width or \
+                    box_height * ((current.size[1] + 1) // 2) < size[1] * height:
+                return current
+            if i + 1 == len(self.levels):
+                self.levels.append(current.reduce(2))
+            i += 1
+
+    def resize(self, size, resample=Image.LANCZOS, box=None):
+        """
+        Equivalent of base.crop(box).resize(size, resample), computed from the
+        smallest pyramid level which covers the target size
+        """
+        level = self.level(size, box)
+        if box is not None and level is not self.base:
+            sx = float(level.size[0]) / self.base.size[0]
+            sy = float(level.size[1]) / self.base.size[1]
+            box = (box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy)
+        return level.resize(size, resample, box=box)
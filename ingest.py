@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Parallel image ingestion with a process pool
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from face_metadata import FaceMetadata
+from metadata_cache import MetadataCache
+
+# ImageProcess of the current worker process, set up by _init_worker
+_worker = None
+
+
+def analyse_image(process, img_path, max_size):
+    """
+    Returns the face metadata of an image without keeping its pixels, cached
+    boxes are returned without decoding or detecting anything. With a
+    detection size the image is decoded only that large here, the layout
+    size pixels are decoded once, later, by the image handles.
+    """
+    if process.detection_size and (max_size is None or process.detection_size < max_size):
+        max_size = process.detection_size
+    img = process.load_image(img_path, max_size)
+    faces = FaceMetadata.of(img)
+    if faces is None:
+        if max_size is not None:
+            img.thumbnail((max_size, max_size), Image.LANCZOS)
+        faces = process.faces_of(img)
+    return faces
+
+
+def _init_worker(worker_class, detection_size, cache_dir):
+    global _worker
+    _worker = worker_class()
+    _worker.detection_size = detection_size
+    if cache_dir is not None:
+        _worker.cache = MetadataCache(cache_dir)
+
+
+def _analyse_worker(job):
+    img_path, max_size = job
+    faces = analyse_image(_worker, img_path, max_size)
+    return faces.size, faces.boxes
+
+
+class ImageIngest():
+    """
+    Fans the per image ingest steps out over a pool of worker processes.
+    Results come back in input order, whatever order the workers finish in.
+    Every worker builds its own worker_class() (the class of process when
+    None), so the workers run the same ImageProcess implementation as the
+    caller.
+    """
+
+    def __init__(self, process, workers=1, worker_class=None):
+        self.process = process
+        self.workers = workers
+        self.worker_class = worker_class or type(process)
+
+    def map(self, function, jobs, initializer=None, initargs=()):
+        """
+        Runs function over jobs in the pool, or in this process for a single worker
+        """
+        jobs = list(jobs)
+        if self.workers <= 1 or len(jobs) <= 1:
+            if initializer is not None:
+                initializer(*initargs)
+            return [function(job) for job in jobs]
+        with ProcessPoolExecutor(min(self.workers, len(jobs)), initializer=initializer,
+                                 initargs=initargs) as pool:
+            return list(pool.map(function, jobs))
+
+    def analyse(self, paths, max_size=None):
+        """
+        Returns the FaceMetadata of every path in input order. Only face boxes
+        travel back from the workers, pixels are decoded later on demand.
+        """
+        if self.workers <= 1:
+            return [analyse_image(self.process, img_path, max_size) for img_path in paths]
+        cache = self.process.cache
+        cache_dir = cache.directory if cache is not None else None
+        results = self.map(_analyse_worker, [(img_path, max_size) for img_path in paths],
+                           _init_worker, (self.worker_class, self.process.detection_size, cache_dir))
+        return [FaceMetadata(size, boxes) for size, boxes in results]
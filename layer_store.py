@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Lossless text-free collage bases kept for re-captioning
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import json
+import os
+from PIL import Image
+
+
+class LayerStore():
+    """
+    Keeps the composite of every collage, before caption and logo are put on
+    it, as a lossless PNG in a directory, together with a manifest of how each
+    one is finished (text location, logo, caption). A later run can then put a
+    different caption on every collage with only the overlay and JPEG encode.
+    """
+
+    manifest_name = 'layers.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest = os.path.join(directory, self.manifest_name)
+        self.entries = []
+
+    def clear(self):
+        """
+        Forgets the bases of a previous run
+        """
+        for entry in self.load():
+            path = os.path.join(self.directory, entry['base'])
+            if os.path.exists(path):
+                os.remove(path)
+        self.entries = []
+        self._write()
+
+    def add(self, bg, text_location='bottom left', logo=True, caption=True, scale=1.0):
+        """
+        Stores bg as a new base and returns its manifest entry
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        entry = {'base': 'base%03d.png' % len(self.entries), 'size': list(bg.size),
+                 'text_location': text_location, 'logo': logo, 'caption': caption, 'scale': scale}
+        # low zlib effort: the base is an intermediate, not a deliverable
+        bg.save(os.path.join(self.directory, entry['base']), compress_level=1)
+        self.entries.append(entry)
+        self._write()
+        return entry
+
+    def load(self):
+        """
+        Returns the manifest entries of the stored bases, in creation order
+        """
+        if not os.path.exists(self.manifest):
+            return []
+        with open(self.manifest) as f:
+            self.entries = json.load(f)
+        return self.entries
+
+    def base(self, entry):
+        """
+        Returns the text-free composite of a manifest entry
+        """
+        with Image.open(os.path.join(self.directory, entry['base'])) as image:
+            return image.convert('RGB')
+
+    def _write(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        tmp = self.manifest + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp, self.manifest)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Justified row layout solver working on aspect ratios only
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import numpy as np
+
+
+def linear_partition(weights, k, min_size=1):
+    """
+    Splits weights, keeping their order, into k contiguous groups whose sums are
+    as close as possible to sum(weights) / k in the least squares sense.
+    Every group holds at least min_size weights, k is lowered when there are
+    too few weights for that. Dynamic programming over prefix sums, returns a
+    list of index lists.
+    """
+    n = len(weights)
+    if n == 0:
+        return []
+    min_size = max(1, min(min_size, n))
+    k = max(1, min(k, n // min_size))
+    prefix = np.concatenate([[0.0], np.cumsum(weights, dtype=float)])
+    ideal = prefix[-1] / k
+    # best[j]: cost of splitting the first j weights into the groups seen so far
+    best = (prefix - ideal) ** 2
+    best[:min_size] = np.inf
+    splits = []
+    for groups in range(2, k + 1):
+        new = np.full(n + 1, np.inf)
+        arg = np.zeros(n + 1, dtype=int)
+        lo = (groups - 1) * min_size
+        for j in range(groups * min_size, n + 1):
+            # the last group starts after lo weights and keeps at least min_size
+            starts = prefix[lo:j - min_size + 1]
+            cost = best[lo:j - min_size + 1] + (prefix[j] - starts - ideal) ** 2
+            m = int(np.argmin(cost))
+            new[j] = cost[m]
+            arg[j] = m + lo
+        splits.append(arg)
+        best = new
+
+    # walk the split points back from the last weight
+    bounds = [n]
+    j = n
+    for arg in reversed(splits):
+        j = int(arg[j])
+        bounds.append(j)
+    bounds.append(0)
+    bounds.reverse()
+    return [list(range(bounds[i], bounds[i + 1])) for i in range(k)]
+
+
+def justified_rows(aspects, width, init_height, margin_size=0):
+    """
+    Picks the row breaks for a justified layout of images with given aspect
+    ratios (width / height), in one pass. The number of rows is chosen so that
+    rows come out close to init_height when scaled to fill `width`.
+    """
+    if not aspects:
+        return []
+    total = sum(a * init_height + margin_size for a in aspects)
+    k = max(1, int(round(total / width)))
+    # no lonely images on a row whenever there are enough images
+    return linear_partition(aspects, k, 2)
+
+
+def collage_geometry(sizes, width, init_height, margin_size=0):
+    """
+    Pure geometry phase of a justified collage, computed from (width, height)
+    tuples only. Returns the canvas height and a list of (image index,
+    (x, y, w, h)) cells; nothing is resampled here.
+    Each row is scaled to fill `width` exactly: cell widths are computed as
+    floats and cell edges are rounded from their running sum, so the rounding
+    error is spread over the row instead of squashing its last image.
+    """
+    aspects = [float(w) / h for w, h in sizes]
+    cells = []
+    y = 0
+    for row in justified_rows(aspects, width, init_height, margin_size):
+        available = width - margin_size * (len(row) - 1)
+        row_height = available / sum(aspects[i] for i in row)
+        height = max(1, int(round(row_height)))
+        edge = 0.0
+        x = 0
+        for i in row:
+            edge += aspects[i] * row_height
+            right = int(round(edge))
+            cells.append((i, (x, y, max(1, right - x), height)))
+            x = right + margin_size
+            edge += margin_size
+        y += height + margin_size
+    return y, cells
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Declarative collage layout templates and their paste plans
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import json
+import os
+from PIL import Image, ImageDraw
+from tile_cache import TileCache
+
+
+class LayoutTemplate():
+    """
+    Collage layout described as data, loaded from a JSON file such as
+
+        {"name": "collage_4_grid", "group": "collage_4",
+         "canvas": [750, 1130], "background": [255, 255, 255],
+         "text": "bottom left", "logo": true,
+         "cells": [{"source": "vertical", "box": [10, 10, 360, 550]}, ...]}
+
+    Every cell takes the next image of its source pool ("horizontal",
+    "vertical", "hero", ...) resized to the (x, y, w, h) box. A cell can carry
+    a "polygon" (canvas coordinates) to clip the tile to any shape. Cells are
+    pasted in file order, later cells cover earlier ones.
+    """
+
+    def __init__(self, data):
+        self.name = data['name']
+        self.group = data.get('group', self.name)
+        self.canvas = tuple(data['canvas'])
+        self.background = tuple(data.get('background', (255, 255, 255)))
+        self.text = data.get('text', 'bottom left')
+        self.logo = data.get('logo', True)
+        self.cells = data['cells']
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def compile(self):
+        return PastePlan(self)
+
+
+class PastePlan():
+    """
+    Compiled form of a LayoutTemplate: the tiles every source image has to be
+    resized to, polygon masks rasterised once per scale, and the paste
+    operations in order. Tiles come from a TileCache, so each (image, size) pair is
+    resampled once however often and by however many templates it is used.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.counts = {}
+        self.ops = []
+        for cell in template.cells:
+            pool = cell['source']
+            slot = self.counts.get(pool, 0)
+            self.counts[pool] = slot + 1
+            x, y, w, h = cell['box']
+            self.ops.append((pool, slot, (w, h), (x, y), cell.get('polygon')))
+        self._masks = {}
+
+    def render(self, pools, tiles=None, scale=1.0):
+        """
+        Renders the plan from pools ({name: list of images}) at scale times
+        the template size. Cells whose pool runs out of images are left empty.
+        tiles is the TileCache shared between renders, a private one is used
+        when it is None.
+        """
+        if tiles is None:
+            tiles = TileCache()
+        canvas = tuple(int(round(d * scale)) for d in self.template.canvas)
+        bg = Image.new('RGB', canvas, self.template.background)
+        for index, pool, slot, (x, y, w, h) in self.cells(pools, scale):
+            bg.paste(tiles.tile(pools[pool][slot], (w, h)), (x, y), self.mask(index, scale))
+        return bg
+
+    def cells(self, pools, scale=1.0):
+        """
+        Returns (op index, pool, slot, (x, y, w, h)) of every cell render()
+        fills from pools at scale, in paste order
+        """
+        cells = []
+        for index, (pool, slot, size, position, polygon) in enumerate(self.ops):
+            if slot < len(pools.get(pool, ())):
+                # scale cell edges, not sizes, so neighbouring cells stay flush
+                x, y = (int(round(position[0] * scale)), int(round(position[1] * scale)))
+                w = int(round((position[0] + size[0]) * scale)) - x
+                h = int(round((position[1] + size[1]) * scale)) - y
+                cells.append((index, pool, slot, (x, y, w, h)))
+        return cells
+
+    def mask(self, index, scale=1.0):
+        """
+        Returns the rasterised polygon of cell index at scale, or None for a
+        rectangle. Masks are drawn once per scale.
+        """
+        pool, slot, size, position, polygon = self.ops[index]
+        if polygon is None:
+            return None
+        key = (index, scale)
+        if key not in self._masks:
+            x, y = (int(round(position[0] * scale)), int(round(position[1] * scale)))
+            w = int(round((position[0] + size[0]) * scale)) - x
+            h = int(round((position[1] + size[1]) * scale)) - y
+            mask = Image.new('L', (w, h), 0)
+            ImageDraw.Draw(mask).polygon([(px * scale - x, py * scale - y) for px, py in polygon], fill=255)
+            self._masks[key] = mask
+        return self._masks[key]
+
+
+def load_templates(directory='layouts'):
+    """
+    Loads every *.json template of the directory, keyed by template name
+    """
+    templates = {}
+    for fn in sorted(os.listdir(directory)):
+        if fn.lower().endswith('.json'):
+            template = LayoutTemplate.load(os.path.join(directory, fn))
+            templates[template.name] = template
+    return templates
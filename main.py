@@ -6,27 +6,82 @@ Program by :
 """
 # Importing Libraries
 from argparse import ArgumentParser
+import logging
 from image_process import ImageProcess
 from collage_create import CollageCreation
+from metadata_cache import MetadataCache
+from ingest import ImageIngest
+from font_registry import fonts
+from layer_store import LayerStore
+from encode_pipeline import EncodePipeline
+from encoder_profiles import PROFILES
 import os
 import random
 from PIL import Image, ImageDraw, ImageFont
 from os.path import isfile, isdir
 from sys import exit
+from functools import partial
 # from PIL.ExifTags import TAGS
 import time
 # import numpy as np
 # import cv2
 
+
+def print_budget_stats(process):
+    """
+    Summarises the --max-bytes encodes of the run
+    """
+    stats = process.budget_stats
+    if stats:
+        print('Byte budget: %d collages, %d encode attempts, %.2f s encoding, %d over budget, qualities %d-%d'
+              % (len(stats), sum(s['attempts'] for s in stats), sum(s['seconds'] for s in stats),
+                 sum(1 for s in stats if not s['fits']), min(s['quality'] for s in stats),
+                 max(s['quality'] for s in stats)))
+
+
 if __name__ == "__main__":
+    # progress of the library modules goes to the console like the prints here
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     # Argument parsing
     parser = ArgumentParser(description='Automatic Photo Collage Maker.')
     parser.add_argument('-f', '--folder', dest='folder',
                         help='folder with images (*.jpg, *.jpeg, *.png)', default='.')
     parser.add_argument('-o', '--output', dest='output',
                         help='path to the destination folder where images are to be saved')
-    parser.add_argument('-t', '--text', dest='text', type=str, action='store',
-                        help='text that you want to display on final collages')
+    parser.add_argument('-t', '--text', dest='text', type=str, action='append',
+                        help='text that you want to display on final collages, repeat it to '
+                             'save every collage once per text')
+    parser.add_argument('-d', '--detect-size', dest='detect_size', type=int,
+                        help='longest side of the working copy used for face detection (default: full resolution)')
+    parser.add_argument('-c', '--cache-dir', dest='cache_dir',
+                        help='folder for the image metadata cache (default: input folder)')
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true',
+                        help='do not read or write the image metadata cache')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1,
+                        help='number of worker processes used to ingest the images')
+    parser.add_argument('--text-colour', dest='text_colour', choices=['region', 'glyph'], default='region',
+                        help='pick one contrasting text colour per caption, or one per character')
+    parser.add_argument('--font', dest='font', default='arial',
+                        help='font of Fonts/ used for the text, e.g. arial or Avenir-Medium')
+    parser.add_argument('--logo-font', dest='logo_font', default='Verdana',
+                        help='font of Fonts/ used for the logo')
+    parser.add_argument('--logo-image', dest='logo_image',
+                        help='image stamped as logo instead of the text logo, e.g. Logo/test1.png')
+    parser.add_argument('-e', '--encoders', dest='encoders', type=int, default=2,
+                        help='number of threads encoding and writing collages in the background, 0 to save in line')
+    parser.add_argument('-p', '--profile', dest='profile', choices=sorted(PROFILES), default='default',
+                        help='encoder profile of the collages: ' +
+                             '; '.join('%s: %s' % (name, PROFILES[name].description) for name in sorted(PROFILES)))
+    parser.add_argument('-m', '--max-bytes', dest='max_bytes', type=int,
+                        help='largest file size of a collage in bytes, quality is lowered to fit')
+    parser.add_argument('--budget-threads', dest='budget_threads', type=int, default=1,
+                        help='qualities tried in parallel while fitting --max-bytes')
+    parser.add_argument('-r', '--renditions', dest='renditions', type=int, nargs='+',
+                        help='longest sides in pixels of the sizes saved of every collage, e.g. 300 1200 2400')
+    parser.add_argument('-l', '--layers', dest='layers',
+                        help='folder where the text-free composites are kept for --recaption')
+    parser.add_argument('--recaption', dest='recaption', action='store_true',
+                        help='only put new text on the composites kept in --layers by an earlier run')
     args = parser.parse_args()
     # Run according to whether path is a file or a directory
 
@@ -42,18 +97,76 @@ if __name__ == "__main__":
 
     if not args.text:
         print('Text not provided. Collages without any text will be created.')
+    for name in (args.font, args.logo_font):
+        try:
+            fonts.path(name)
+        except ValueError:
+            print('Font %s not found. Available fonts: %s' % (name, ', '.join(fonts.available())))
+            exit(1)
     # create an instance of defined class
     process = CollageCreation(args.output, args.text)
+    process.detection_size = args.detect_size
+    process.text_colour = args.text_colour
+    process.caption_font = args.font
+    process.logo_font = args.logo_font
+    process.logo_image = args.logo_image
+    process.profile = PROFILES[args.profile]
+    if args.renditions:
+        process.renditions = args.renditions
+        # a tile is never larger than the largest rendition
+        process.source_size = max(process.source_size, max(args.renditions))
+    if args.max_bytes:
+        if 'quality' not in process.profile.params:
+            print('Encoder profile %s has no quality to fit --max-bytes.' % args.profile)
+            exit(1)
+        process.max_bytes = args.max_bytes
+        process.budget_workers = args.budget_threads
+    if args.encoders > 0:
+        process.encoder = EncodePipeline(args.encoders)
+    if args.layers:
+        process.layers = LayerStore(args.layers)
+    if args.recaption:
+        if process.layers is None:
+            print('Please provide the folder of the kept composites with --layers.')
+            exit(1)
+        filenames = process.recaption()
+        if process.encoder is not None:
+            process.encoder.close()
+        print_budget_stats(process)
+        print('%d collages have been captioned again. Head over to the output directory...' % len(filenames))
+        exit(0)
+    if process.layers is not None:
+        process.layers.clear()
+    if not args.no_cache:
+        process.cache = MetadataCache(args.cache_dir or args.folder)
+        try:
+            process.cache.connect()
+        except Exception:
+            print('Metadata cache could not be opened. Continuing without cache..')
+            process.cache = None
 
     if isfile(args.folder):
         print('Please provide different directory containing at-least 2 images.. ')
         exit(1)
     elif isdir(args.folder):
-        count, images = process.processdir(args.folder)
+        paths = process.list_images(args.folder)
+        count = len(paths)
         print('Number of Input Images: ' + str(count))
+        # Plan the layouts from the file headers before any pixels are decoded
+        headers = [process.read_header(img_path) for img_path in paths]
+        landscape = sum(1 for width, height, orientation in headers if width >= height)
+        print('Landscape images: %d, portrait images: %d' % (landscape, count - landscape))
+        layouts = process.plan_layouts(count)
+        if not layouts:
+            print('Please provide different directory containing at-least 2 images.. ')
+            exit(1)
+        # Detect faces in parallel, pixels are only decoded when a layout needs them
+        faces = ImageIngest(process, args.workers, ImageProcess).analyse(paths, process.source_size)
+        images = list(process.iter_images(paths, process.source_size, faces))
 
     # shuffle images if needed
-    random.shuffle(images)
+    photos = list(zip(images, headers))
+    random.shuffle(photos)
     # image_list = []
     # list_hor = []
     # list_ver = []
@@ -69,21 +182,19 @@ if __name__ == "__main__":
 
     # random.shuffle(image_list)
 
-    for img in images:
-        img.thumbnail((1200, 1200), Image.ANTIALIAS)
-        ar = img.size[0] / img.size[1]
-        if ar < 1:
+    for img, (width, height, orientation) in photos:
+        if width < height:
             vertical.append(img)
-            image1 = process.face_detection(img, 900, 600)
+            image1 = img.derive(partial(process.face_detection, output_width=900, output_height=600))
             horizontal.append(image1)
         else:
             horizontal.append(img)
-            image2 = process.face_detection(img, 600, 900)
+            image2 = img.derive(partial(process.face_detection, output_width=600, output_height=900))
             vertical.append(image2)
     # shuffle images if needed
     random.shuffle(images)
     temp = images[0]
-    temp = process.face_detection(img, 900, 450)
+    temp = process.face_detection(img.decode(), 900, 450)
 
     # if(len(list_hor) > 2) and (len(list_ver) < 4):
     #     process.collage_2_hor(list_hor)
@@ -105,24 +216,41 @@ if __name__ == "__main__":
     #     process.collage_2_hor(list_hor)
     #     process.collage_2_hor(list_hor)
 
-    process.collage_3_hor(horizontal, vertical)
-    process.collage_2_hor(horizontal)
-    process.collage_4(vertical)
-    process.black_magic(vertical)
-    process.portfolio(vertical, temp)
+    if 'collage_3_hor' in layouts:
+        process.collage_3_hor(horizontal, vertical)
+    if 'collage_2_hor' in layouts:
+        process.collage_2_hor(horizontal)
+    if 'collage_4' in layouts:
+        process.collage_4(vertical)
+    if 'black_magic' in layouts:
+        process.black_magic(vertical)
+    if 'portfolio' in layouts:
+        process.portfolio(vertical, temp)
+    # Layouts which only exist as data files in layouts/
+    for group in process.template_groups():
+        if not hasattr(process, group):
+            process.render_group(group, horizontal=horizontal, vertical=vertical, hero=[temp])
 
     # res = process.make_collage(images, 1200, 450)
     # if not res:
     #     print('Failed to create collage!')
     #     exit(1)
-    res = process.make_collage(images, 800, 300)
-    if not res:
-        print('Failed to create collage!')
-        exit(1)
+    if 'make_collage' in layouts:
+        res = process.make_collage(images, 800, 300)
+        if not res:
+            print('Failed to create collage!')
+            exit(1)
 
     # process.collage_3_hor(horizontal, vertical)
     # process.collage_2_hor(horizontal)
     # process.collage_4(vertical)
     # process.black_magic(vertical)
 
+    # exit only once every collage is written
+    if process.encoder is not None:
+        process.encoder.close()
+    print_budget_stats(process)
+    stats = process.tile_cache.stats()
+    print('Tile cache: %d hits, %d misses, %d tiles (%.1f MB) held'
+          % (stats['hits'], stats['misses'], stats['tiles'], stats['nbytes'] / 1e6))
     print('All collages has been created. Head over to the output directory...')
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Persistent per-image metadata cache
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class MetadataCache():
+    """
+    SQLite sidecar cache of per-image metadata: dimensions, EXIF orientation,
+    face boxes and dominant colour. Entries are keyed by a hash of the file
+    content and remember the size and mtime the file had when it was hashed,
+    so an unchanged file is recognised from a single stat() call and only
+    touched or moved files have to be hashed again. The total size of the
+    stored entries is bounded and least recently used entries are evicted.
+    """
+
+    filename = '.collage_cache.sqlite'
+
+    def __init__(self, directory, max_bytes=8 * 1024 * 1024):
+        self.directory = directory
+        self.path = os.path.join(directory, self.filename)
+        self.max_bytes = max_bytes
+        self._pid = None
+        self._db = None
+        self._total = 0
+
+    def connect(self):
+        # sqlite connections must not be shared with forked workers
+        if self._db is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute('CREATE TABLE IF NOT EXISTS images ('
+                             'digest TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime INTEGER, '
+                             'width INTEGER, height INTEGER, orientation INTEGER, '
+                             'faces TEXT, colour TEXT, nbytes INTEGER, last_used REAL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS images_path ON images (path)')
+            self._db.commit()
+            self._total = self._db.execute('SELECT COALESCE(SUM(nbytes), 0) FROM images').fetchone()[0]
+        return self._db
+
+    def digest(self, path):
+        """
+        Returns the content hash of the file
+        """
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def lookup(self, path):
+        """
+        Returns (key, entry) for the file. entry is a dict of the cached fields,
+        or None when nothing valid is cached; key is then used to store them.
+        """
+        db = self.connect()
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        row = db.execute('SELECT digest FROM images WHERE path = ? AND size = ? AND mtime = ?',
+                         (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row is not None:
+            key = row[0]
+        else:
+            # Unknown, touched or moved file: fall back to the content hash
+            key = self.digest(path)
+            db.execute('UPDATE images SET path = ?, size = ?, mtime = ? WHERE digest = ?',
+                       (path, stat.st_size, stat.st_mtime_ns, key))
+        entry = self._read(key)
+        if entry is None:
+            db.execute('INSERT OR IGNORE INTO images (digest, path, size, mtime, nbytes, last_used) '
+                       'VALUES (?, ?, ?, ?, 0, ?)', (key, path, stat.st_size, stat.st_mtime_ns, time.time()))
+        db.commit()
+        return key, entry
+
+    def _read(self, key):
+        db = self.connect()
+        row = db.execute('SELECT width, height, orientation, faces, colour FROM images WHERE digest = ?',
+                         (key,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        try:
+            entry = {'size': (row[0], row[1]),
+                     'orientation': row[2],
+                     'faces': json.loads(row[3]) if row[3] else None,
+                     'colour': tuple(json.loads(row[4])) if row[4] else None}
+        except ValueError:
+            # Corrupt entry, drop it and treat the file as unseen
+            self.invalidate(key)
+            return None
+        db.execute('UPDATE images SET last_used = ? WHERE digest = ?', (time.time(), key))
+        return entry
+
+    def store(self, key, size=None, orientation=None, faces=None, colour=None):
+        """
+        Updates the given fields of the entry, fields left as None are kept
+        """
+        db = self.connect()
+        fields = {}
+        if size is not None:
+            fields['width'], fields['height'] = size
+        if orientation is not None:
+            fields['orientation'] = orientation
+        if faces is not None:
+            fields['faces'] = json.dumps(faces)
+        if colour is not None:
+            fields['colour'] = json.dumps(list(colour))
+        if not fields:
+            return
+        assignments = ', '.join('%s = ?' % name for name in fields)
+        db.execute('UPDATE images SET %s, last_used = ? WHERE digest = ?' % assignments,
+                   list(fields.values()) + [time.time(), key])
+        row = db.execute('SELECT nbytes, LENGTH(digest) + LENGTH(path) + 32 + '
+                         'COALESCE(LENGTH(faces), 0) + COALESCE(LENGTH(colour), 0) '
+                         'FROM images WHERE digest = ?', (key,)).fetchone()
+        if row is not None:
+            db.execute('UPDATE images SET nbytes = ? WHERE digest = ?', (row[1], key))
+            self._total += row[1] - row[0]
+        if self._total > self.max_bytes:
+            self.evict()
+        db.commit()
+
+    def invalidate(self, key):
+        """
+        Removes the entry, the next lookup of the file starts from scratch
+        """
+        db = self.connect()
+        row = db.execute('SELECT nbytes FROM images WHERE digest = ?', (key,)).fetchone()
+        if row is not None:
+            db.execute('DELETE FROM images WHERE digest = ?', (key,))
+            self._total -= row[0]
+        db.commit()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits into max_bytes
+        """
+        db = self.connect()
+        rows = db.execute('SELECT digest, nbytes FROM images ORDER BY last_used').fetchall()
+        for key, nbytes in rows:
+            if self._total <= self.max_bytes:
+                break
+            db.execute('DELETE FROM images WHERE digest = ?', (key,))
+            self._total -= nbytes
+        db.commit()
+
+    def close(self):
+        if self._db is not None and self._pid == os.getpid():
+            self._db.close()
+        self._db = None
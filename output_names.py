@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Collision-free output file names with atomic writes
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import errno
+import itertools
+import os
+import tempfile
+import threading
+import time
+from PIL import Image
+
+# errnos of os.link on file systems without hard links (FAT, exFAT, some SMB mounts)
+_NO_LINKS = set(getattr(errno, code) for code in ('EPERM', 'EOPNOTSUPP', 'ENOTSUP', 'ENOSYS', 'EINVAL')
+                if hasattr(errno, code))
+
+
+class OutputNames():
+    """
+    Names the collages of a run collage<run start>-<sequence>.jpg, the
+    sequence being a per-run counter shared by all threads. Files are encoded
+    under a temporary name and published with a hard link, or on file systems
+    without hard links an exclusive create of the name and a rename onto it,
+    neither of which replaces an existing file: a name taken meanwhile by a
+    concurrent run is skipped for the next sequence number instead of being
+    overwritten, so neither sleeps nor locks between runs are needed.
+    """
+
+    def __init__(self, directory, prefix='collage'):
+        self.directory = directory
+        self.prefix = prefix
+        now = time.time()
+        self.run = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + '%03d' % int((now % 1) * 1000)
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def name(self, suffix='', ext='.jpg'):
+        """
+        Returns the path for the next collage of the run
+        """
+        with self._lock:
+            sequence = next(self._sequence)
+        return os.path.join(self.directory, '%s%s-%03d%s%s' % (self.prefix, self.run, sequence, suffix, ext))
+
+    def save(self, image, filename, suffix='', **params):
+        """
+        Encodes image with params and atomically publishes it as filename, or
+        under the next free name with the same suffix if filename is taken.
+        Returns the final path.
+        """
+        fmt = Image.registered_extensions().get(os.path.splitext(filename)[1].lower())
+        return self.publish(lambda f: image.save(f, fmt, **params), filename, suffix)
+
+    def write(self, data, filename, suffix=''):
+        """
+        Atomically publishes already encoded bytes like save()
+        """
+        return self.publish(lambda f: f.write(data), filename, suffix)
+
+    def publish(self, write, filename, suffix=''):
+        """
+        Runs write(file) on a temporary file next to filename, syncs it and
+        claims filename for it, or the next free name with the same suffix
+        (e.g. the caption or rendition tag of name()). Returns the final path.
+        """
+        ext = os.path.splitext(filename)[1]
+        fd, tmp = tempfile.mkstemp(prefix='.tmp-', suffix=ext, dir=os.path.dirname(filename) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            while True:
+                try:
+                    self.claim(tmp, filename)
+                    return filename
+                except FileExistsError:
+                    filename = self.name(suffix, ext)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def claim(self, tmp, filename):
+        """
+        Makes tmp visible as filename, raising FileExistsError if filename
+        already exists. Without hard links the name is reserved with an
+        exclusive create and tmp renamed onto the reservation.
+        """
+        try:
+            os.link(tmp, filename)
+            return
+        except OSError as e:
+            if e.errno not in _NO_LINKS:
+                raise
+        os.close(os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        os.replace(tmp, filename)
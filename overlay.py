@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Pre-rendered RGBA overlay sprites for captions and logos
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import threading
+from PIL import Image, ImageDraw
+from font_registry import fonts
+
+
+class OverlayCache():
+    """
+    Process-wide cache of the overlays stamped on every collage. A text is
+    rasterised once per (text, font, colour) into an RGBA sprite and an image
+    logo is loaded once and scaled once per target height; stamping is then a
+    single alpha masked paste.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sprites = {}
+
+    def text(self, text, font, colour):
+        """
+        Returns the RGBA sprite of text drawn in colour with font, cut to its
+        ink box (fonts.getsize). Pasted at a point it puts the top left corner
+        of the ink there.
+        """
+        key = ('text', font, text, colour)
+        with self._lock:
+            sprite = self._sprites.get(key)
+        if sprite is None:
+            left, top, right, bottom = fonts.bbox(font, text)
+            sprite = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+            ImageDraw.Draw(sprite).text((-left, -top), text, fill=colour, font=font)
+            with self._lock:
+                self._sprites[key] = sprite
+        return sprite
+
+    def image(self, path, height):
+        """
+        Returns the logo image at path scaled to height, keeping its aspect
+        ratio. Scaling is done on premultiplied alpha, so transparent pixels do
+        not bleed dark fringes into the edges of the logo.
+        """
+        key = ('image', path, height)
+        with self._lock:
+            sprite = self._sprites.get(key)
+        if sprite is None:
+            with Image.open(path) as logo:
+                logo = logo.convert('RGBA')
+            width = max(1, int(round(logo.size[0] * float(height) / logo.size[1])))
+            sprite = logo.convert('RGBa').resize((width, height), Image.LANCZOS).convert('RGBA')
+            with self._lock:
+                self._sprites[key] = sprite
+        return sprite
+
+    def stamp(self, img, sprite, coord):
+        """
+        Alpha composites sprite onto img (in place) with its top left corner at coord
+        """
+        img.paste(sprite, coord, sprite)
+        return img
+
+
+overlays = OverlayCache()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the caption and logo overlays
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import os
+import pytest
+from PIL import Image, ImageChops
+from image_process import ImageProcess
+
+# Fonts/ is looked up relative to the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+def finish(text_colour='region', background=(255, 255, 255)):
+    process = ImageProcess()
+    process.captions = ['Save the date']
+    process.text_colour = text_colour
+    bg = Image.new('RGB', (600, 400), background)
+    [(suffix, text, img, factor)] = process.finished_images(bg.copy(), 'bottom left', True, True)
+    assert suffix == '' and text == 'Save the date'
+    return bg, img
+
+
+@pytest.mark.parametrize('text_colour', ['region', 'glyph'])
+def test_caption_and_logo_sit_on_the_margins(text_colour):
+    bg, img = finish(text_colour)
+    caption = ImageChops.difference(bg, img).crop((0, 0, 300, 400)).getbbox()
+    logo = ImageChops.difference(bg, img).crop((300, 0, 600, 400)).getbbox()
+    assert caption is not None and logo is not None
+    assert abs(caption[0] - 20) <= 1 and abs(caption[3] - 380) <= 1
+    assert abs(300 + logo[2] - 580) <= 1 and abs(logo[3] - 380) <= 1
+
+
+def test_text_contrasts_with_the_background():
+    bg, img = finish(background=(255, 255, 255))
+    assert img.convert('L').getextrema()[0] < 64
+    bg, img = finish(background=(0, 0, 0))
+    assert img.convert('L').getextrema()[1] > 192
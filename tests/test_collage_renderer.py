@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Smoke tests of the in-memory rendering API
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import io
+import os
+import numpy as np
+import pytest
+from PIL import Image
+from collage_renderer import CollageRenderer
+
+# Fonts/ and layouts/ are looked up relative to the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+def photos(count, size=(300, 450)):
+    rng = np.random.RandomState(count)
+    return [Image.fromarray(rng.randint(0, 256, (size[1], size[0], 3)).astype(np.uint8)) for _ in range(count)]
+
+
+def test_render_without_encoding_returns_images():
+    before = sorted(os.listdir(ROOT))
+    renderer = CollageRenderer(text=['Save the date', 'Just married'])
+    results = renderer.render(photos(4), 'collage_4_grid', encode=False)
+    assert sorted(os.listdir(ROOT)) == before
+    assert [result['caption'] for result in results] == ['Save the date', 'Just married']
+    for result in results:
+        assert 'data' not in result and result['image'].size == result['size'] == (750, 1130)
+        assert result['layout'] == 'collage_4_grid' and result['rendition'] is None
+        assert sorted(cell['input'] for cell in result['cells']) == [0, 1, 2, 3]
+        assert [cell['box'] for cell in result['cells']][0] == (10, 10, 360, 550)
+    assert results[0]['image'].tobytes() != results[1]['image'].tobytes()
+
+
+def test_render_justified_rows_from_paths_and_renditions():
+    paths = [os.path.join('tests', fn) for fn in ('_DSC0027.JPG', '_DSC0055.JPG', '_DSC0195.JPG')]
+    renderer = CollageRenderer(renditions=[400, 200])
+    results = renderer.render(paths, 'make_collage', encode=False)
+    assert [max(result['size']) for result in results] == [400, 200]
+    for result in results:
+        assert result['image'].size == result['size']
+        assert sorted(cell['input'] for cell in result['cells']) == [0, 1, 2]
+
+
+def test_render_encodes_with_the_profile():
+    [result] = CollageRenderer(text='Hi', profile='web').render(photos(4), 'collage_4_tight')
+    image = Image.open(io.BytesIO(result['data']))
+    assert image.format == result['format'] and image.size == result['size']
+
+
+def test_render_rejects_unknown_layouts_and_too_few_images():
+    renderer = CollageRenderer()
+    with pytest.raises(ValueError, match='not found'):
+        renderer.render(photos(4), 'collage_5')
+    with pytest.raises(ValueError, match='needs 4 images'):
+        renderer.render(photos(3), 'collage_4_grid', encode=False)
+    with pytest.raises(ValueError, match='At least 2'):
+        renderer.render(photos(1), 'make_collage', encode=False)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the background encode pipeline
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import threading
+import time
+import pytest
+from encode_pipeline import EncodePipeline
+
+
+def test_flush_returns_filenames_in_submit_order():
+    # the first save only finishes after the last one
+    last_done = threading.Event()
+    written = []
+
+    def save(image, filename):
+        if filename == 'a.jpg':
+            assert last_done.wait(5)
+        written.append(filename)
+        if filename == 'c.jpg':
+            last_done.set()
+        return filename
+
+    pipeline = EncodePipeline(workers=3)
+    for filename in ('a.jpg', 'b.jpg', 'c.jpg'):
+        pipeline.submit(save, None, filename)
+    assert pipeline.flush() == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert written[-1] == 'a.jpg' and sorted(written) == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert pipeline.flush() == []
+    pipeline.close()
+
+
+def test_flush_waits_for_every_file_and_raises_the_first_error():
+    written = []
+
+    def save(image, filename, delay=0.0):
+        time.sleep(delay)
+        if filename.startswith('bad'):
+            raise IOError(filename)
+        written.append(filename)
+        return filename
+
+    pipeline = EncodePipeline(workers=2)
+    pipeline.submit(save, None, 'bad1.jpg', delay=0.05)
+    pipeline.submit(save, None, 'bad2.jpg')
+    pipeline.submit(save, None, 'slow.jpg', delay=0.1)
+    with pytest.raises(IOError, match='bad1'):
+        pipeline.flush()
+    # the failure did not stop the other files, nor leave them queued
+    assert written == ['slow.jpg']
+    assert pipeline.close() == []
+
+
+def test_submit_blocks_while_pending_collages_wait():
+    release = threading.Event()
+    started = threading.Event()
+
+    def save(image, filename):
+        started.set()
+        assert release.wait(5)
+        return filename
+
+    pipeline = EncodePipeline(workers=1, pending=2)
+    pipeline.submit(save, None, 'a.jpg')
+    pipeline.submit(save, None, 'b.jpg')
+    assert started.wait(5)
+    third = threading.Thread(target=pipeline.submit, args=(save, None, 'c.jpg'))
+    third.start()
+    third.join(0.2)
+    assert third.is_alive()
+    release.set()
+    third.join(5)
+    assert not third.is_alive()
+    assert pipeline.close() == ['a.jpg', 'b.jpg', 'c.jpg']
+
+
+def test_close_flushes_before_shutting_down():
+    written = []
+
+    def save(image, filename):
+        time.sleep(0.05)
+        written.append(filename)
+        return filename
+
+    pipeline = EncodePipeline(workers=2)
+    assert pipeline.close() == []
+    pipeline.submit(save, None, 'a.jpg')
+    pipeline.submit(save, None, 'b.jpg')
+    assert pipeline.close() == ['a.jpg', 'b.jpg']
+    assert sorted(written) == ['a.jpg', 'b.jpg']
+    # a closed pipeline starts a new pool on the next submit
+    pipeline.submit(save, None, 'c.jpg')
+    assert pipeline.close() == ['c.jpg']
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the encoder profiles and the byte budget search
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from io import BytesIO
+import random
+import pytest
+from PIL import Image
+from encoder_profiles import PROFILES
+
+
+def noise(size=(240, 160), seed=5):
+    rng = random.Random(seed)
+    grey = Image.frombytes('L', size, bytes(rng.randint(64, 192) for _ in range(size[0] * size[1])))
+    return Image.merge('RGB', (grey, grey.transpose(Image.FLIP_LEFT_RIGHT), grey.transpose(Image.FLIP_TOP_BOTTOM)))
+
+
+def test_budget_met_at_profile_quality():
+    profile = PROFILES['default']
+    image = noise()
+    data, stats = profile.encode_within(image, 10 ** 7)
+    assert stats['fits'] and stats['quality'] == profile.params['quality'] and stats['attempts'] == 1
+    assert data == profile.encode(image)
+
+
+def test_budget_picks_highest_fitting_quality():
+    profile = PROFILES['default']
+    image = noise()
+    max_bytes = len(profile.encode(image, quality=50))
+    data, stats = profile.encode_within(image, max_bytes)
+    assert stats['fits'] and len(data) == stats['bytes'] <= max_bytes
+    assert len(profile.encode(image, quality=stats['quality'] + 1)) > max_bytes
+    assert Image.open(BytesIO(data)).size == image.size
+
+
+def test_parallel_search_finds_the_same_quality():
+    profile = PROFILES['web']
+    image = noise()
+    max_bytes = len(profile.encode(image, quality=40))
+    serial = profile.encode_within(image, max_bytes)[1]
+    parallel = profile.encode_within(image, max_bytes, workers=3)[1]
+    assert serial['quality'] == parallel['quality']
+
+
+def test_budget_that_cannot_be_met():
+    profile = PROFILES['default']
+    image = noise()
+    data, stats = profile.encode_within(image, 100)
+    assert not stats['fits'] and stats['bytes'] == len(data) > 100
+    # the smallest encode tried, which is at most the quality 1 one
+    assert len(data) <= len(profile.encode(image, quality=1))
+    assert Image.open(BytesIO(data)).size == image.size
+
+
+def test_profile_without_quality():
+    with pytest.raises(ValueError):
+        PROFILES['png'].encode_within(noise(), 1000)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the image pyramid
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from PIL import Image
+from image_pyramid import ImagePyramid
+
+
+def gradient(size=(640, 480)):
+    image = Image.linear_gradient('L').resize(size)
+    return Image.merge('RGB', (image, image.transpose(Image.FLIP_LEFT_RIGHT), image))
+
+
+def test_resize_matches_target_size():
+    pyramid = ImagePyramid(gradient())
+    assert pyramid.resize((100, 75)).size == (100, 75)
+    assert pyramid.resize((50, 50), box=(0, 0, 320, 240)).size == (50, 50)
+
+
+def test_levels_cover_the_target():
+    pyramid = ImagePyramid(gradient())
+    level = pyramid.level((100, 75))
+    assert level.size[0] >= 100 and level.size[1] >= 75
+    assert len(pyramid.levels) > 1
+
+
+def test_palette_image_is_reduced_as_rgb():
+    pyramid = ImagePyramid(gradient().convert('P'))
+    tile = pyramid.resize((100, 75))
+    assert pyramid.base.mode == 'RGB'
+    assert tile.size == (100, 75) and tile.mode == 'RGB'
+    assert len(pyramid.levels) > 1
+
+
+def test_transparent_palette_image_keeps_alpha():
+    image = gradient().convert('P')
+    image.info['transparency'] = 0
+    assert ImagePyramid(image).resize((100, 75)).mode == 'RGBA'
+
+
+def test_bilevel_and_16_bit_images():
+    assert ImagePyramid(gradient().convert('1')).resize((100, 75)).mode == 'L'
+    assert ImagePyramid(Image.new('I;16', (640, 480), 1000)).resize((100, 75)).mode == 'I'
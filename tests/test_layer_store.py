@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the layer store and re-captioning
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import os
+import numpy as np
+import pytest
+from PIL import Image
+from image_process import ImageProcess
+from layer_store import LayerStore
+
+# Fonts/ is looked up relative to the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+def run(tmp_path, output, captions, renditions=None):
+    process = ImageProcess()
+    process.output = str(tmp_path / output)
+    os.makedirs(process.output)
+    process.captions = captions
+    process.renditions = renditions
+    process.layers = LayerStore(str(tmp_path / 'layers'))
+    return process
+
+
+def composite(seed, size=(300, 200)):
+    rng = np.random.RandomState(seed)
+    return Image.fromarray(rng.randint(0, 256, (size[1], size[0], 3)).astype(np.uint8))
+
+
+def contents(filenames):
+    result = []
+    for filename in filenames:
+        with open(filename, 'rb') as f:
+            result.append(f.read())
+    return result
+
+
+def test_recaption_matches_a_run_with_the_new_caption(tmp_path):
+    first = run(tmp_path, 'first', ['Save the date'], [300, 150])
+    bgs = [(composite(1), 'bottom left', True, True, 1.0), (composite(2), 'top right', False, False, 0.5)]
+    saved = []
+    for bg, text_location, logo, caption, scale in bgs:
+        # the largest rendition is finished in place
+        saved += first.save_collage(bg.copy(), text_location, logo, caption, scale)
+
+    store = LayerStore(str(tmp_path / 'layers'))
+    entries = store.load()
+    assert [(e['text_location'], e['logo'], e['caption'], e['scale']) for e in entries] == \
+        [(text_location, logo, caption, scale) for bg, text_location, logo, caption, scale in bgs]
+    # the bases are lossless
+    assert [store.base(e).tobytes() for e in entries] == [bg.tobytes() for bg, t, l, c, s in bgs]
+
+    second = run(tmp_path, 'second', ['Just married'], [300, 150])
+    recaptioned = second.recaption()
+    direct = run(tmp_path, 'direct', ['Just married'], [300, 150])
+    direct.layers = None
+    expected = []
+    for bg, text_location, logo, caption, scale in bgs:
+        expected += direct.finish_collage(bg.copy(), text_location, logo, caption, scale)
+    assert [f[-10:] for f in recaptioned] == [f[-10:] for f in expected] == [f[-10:] for f in saved]
+    assert contents(recaptioned) == contents(expected)
+    # only the captioned collage changes, two renditions each
+    assert contents(recaptioned)[:2] != contents(saved)[:2]
+    assert contents(recaptioned)[2:] == contents(saved)[2:]
+
+
+def test_clear_forgets_the_bases(tmp_path):
+    process = run(tmp_path, 'out', ['Save the date'])
+    process.save_collage(composite(1))
+    store = process.layers
+    base = os.path.join(store.directory, store.load()[0]['base'])
+    assert os.path.exists(base)
+    store.clear()
+    assert store.load() == [] and not os.path.exists(base)
+    assert process.recaption() == []
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the justified row layout solver
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from itertools import combinations
+import random
+from layout_solver import linear_partition, justified_rows, collage_geometry
+
+
+def partition_cost(weights, groups, k):
+    ideal = sum(weights) / float(k)
+    return sum((sum(weights[i] for i in group) - ideal) ** 2 for group in groups)
+
+
+def brute_force(weights, k, min_size=1):
+    """
+    Lowest cost of all splits of weights into k contiguous groups of at least
+    min_size weights
+    """
+    n = len(weights)
+    best = None
+    for cuts in combinations(range(1, n), k - 1):
+        bounds = (0,) + cuts + (n,)
+        groups = [range(bounds[i], bounds[i + 1]) for i in range(k)]
+        if any(len(group) < min_size for group in groups):
+            continue
+        cost = partition_cost(weights, groups, k)
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def test_linear_partition_matches_brute_force():
+    rng = random.Random(7)
+    for n in range(1, 8):
+        for k in range(1, n + 1):
+            for _ in range(5):
+                weights = [rng.uniform(0.3, 2.5) for _ in range(n)]
+                groups = linear_partition(weights, k)
+                assert len(groups) == k and all(groups)
+                assert [i for group in groups for i in group] == list(range(n))
+                assert abs(partition_cost(weights, groups, k) - brute_force(weights, k)) < 1e-9
+
+
+def test_linear_partition_min_size_matches_brute_force():
+    rng = random.Random(11)
+    for min_size in (2, 3):
+        for n in range(min_size, 10):
+            for k in range(1, n // min_size + 1):
+                for _ in range(3):
+                    weights = [rng.uniform(0.3, 2.5) for _ in range(n)]
+                    groups = linear_partition(weights, k, min_size)
+                    assert len(groups) == k and all(len(group) >= min_size for group in groups)
+                    assert [i for group in groups for i in group] == list(range(n))
+                    best = brute_force(weights, k, min_size)
+                    assert abs(partition_cost(weights, groups, k) - best) < 1e-9
+
+
+def test_linear_partition_bounds():
+    assert linear_partition([], 3) == []
+    assert linear_partition([1.0, 2.0], 5) == [[0], [1]]
+    assert linear_partition([1.0, 2.0, 3.0], 0) == [[0, 1, 2]]
+    assert linear_partition([1.0, 2.0, 3.0], 3, 2) == [[0, 1, 2]]
+    assert linear_partition([1.0], 3, 2) == [[0]]
+
+
+def test_justified_rows_keep_order_and_pair_images():
+    aspects = [1.5, 0.66, 1.33, 0.75, 1.0, 1.78]
+    rows = justified_rows(aspects, 800, 300)
+    assert [i for row in rows for i in row] == list(range(len(aspects)))
+    assert all(len(row) >= 2 for row in rows)
+    assert justified_rows([], 800, 300) == []
+    assert justified_rows([1.5], 800, 300) == [[0]]
+
+
+def test_justified_rows_never_leave_a_lonely_image():
+    # a wide image next to narrow ones used to get a row of its own
+    assert justified_rows([3.0, 0.66, 0.66, 0.66], 800, 300) == [[0, 1], [2, 3]]
+    rng = random.Random(5)
+    for n in range(2, 12):
+        for _ in range(10):
+            aspects = [rng.choice([rng.uniform(0.5, 0.8), rng.uniform(2.0, 4.0)]) for _ in range(n)]
+            rows = justified_rows(aspects, 800, rng.randint(150, 400))
+            assert [i for row in rows for i in row] == list(range(n))
+            assert all(len(row) >= 2 for row in rows)
+
+
+def test_collage_geometry_fills_every_row():
+    rng = random.Random(3)
+    sizes = [(rng.randint(300, 1600), rng.randint(300, 1600)) for _ in range(9)]
+    height, cells = collage_geometry(sizes, 800, 300)
+    assert sorted(i for i, box in cells) == list(range(len(sizes)))
+    rows = {}
+    for i, (x, y, w, h) in cells:
+        rows.setdefault(y, []).append((x, w, h))
+    for y, row in rows.items():
+        row.sort()
+        assert row[0][0] == 0 and row[-1][0] + row[-1][1] == 800
+        assert all(a[0] + a[1] == b[0] for a, b in zip(row, row[1:]))
+        assert len(set(h for x, w, h in row)) == 1
+    assert height == max(y + row[0][2] for y, row in rows.items())
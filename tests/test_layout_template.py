@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the layout templates against the former hard-coded layouts
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import os
+import pytest
+from PIL import Image
+from layout_template import load_templates
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Canvas, text corner, logo and pastes ((pool, slot), size, position) of the
+# layouts collage_create.py used to hard-code, in their paste order. The
+# black_magic loops fell through to their else branch for the first two
+# photos as well, those extra pastes are covered by the last one.
+HARD_CODED = {
+    'collage_2_hor_stacked': ((790, 1085), 'bottom left', True, [
+        (('horizontal', 0), (780, 535), (5, 5)),
+        (('horizontal', 1), (780, 535), (5, 545))]),
+    'collage_3_hor_top': ((815, 1145), 'bottom left', True, [
+        (('horizontal', 0), (805, 530), (5, 5)),
+        (('vertical', 0), (400, 600), (5, 540)),
+        (('vertical', 1), (400, 600), (410, 540))]),
+    'collage_3_hor_top_tight': ((800, 1130), 'bottom left', True, [
+        (('horizontal', 0), (805, 530), (0, 0)),
+        (('vertical', 0), (400, 600), (0, 530)),
+        (('vertical', 1), (400, 600), (400, 530))]),
+    'collage_3_hor_bottom': ((815, 1145), 'bottom left', True, [
+        (('horizontal', 0), (805, 530), (5, 610)),
+        (('vertical', 0), (400, 600), (5, 5)),
+        (('vertical', 1), (400, 600), (410, 5))]),
+    'collage_3_hor_bottom_tight': ((800, 1130), 'bottom left', True, [
+        (('horizontal', 0), (800, 530), (0, 600)),
+        (('vertical', 0), (400, 600), (0, 0)),
+        (('vertical', 1), (400, 600), (400, 0))]),
+    'collage_4_grid': ((750, 1130), 'bottom left', True, [
+        (('vertical', 0), (360, 550), (10, 10)),
+        (('vertical', 1), (360, 550), (380, 10)),
+        (('vertical', 2), (360, 550), (10, 570)),
+        (('vertical', 3), (360, 550), (380, 570))]),
+    'collage_4_staggered': ((730, 1120), 'top right', True, [
+        (('vertical', 0), (350, 500), (10, 10)),
+        (('vertical', 1), (350, 500), (370, 100)),
+        (('vertical', 2), (350, 500), (10, 520)),
+        (('vertical', 3), (350, 500), (370, 610))]),
+    'collage_4_tight': ((760, 1140), 'bottom left', True, [
+        (('vertical', 0), (400, 600), (0, 0)),
+        (('vertical', 1), (400, 600), (400, 0)),
+        (('vertical', 2), (400, 600), (0, 600)),
+        (('vertical', 3), (400, 600), (400, 600))]),
+    'black_magic_left': ((735, 1055), 'bottom left', False, [
+        (('vertical', 0), (400, 600), (5, 5)),
+        (('vertical', 0), (300, 440), (15, 610)),
+        (('vertical', 1), (400, 600), (330, 450)),
+        (('vertical', 1), (300, 440), (15, 610)),
+        (('vertical', 2), (300, 440), (420, 5)),
+        (('vertical', 3), (300, 440), (15, 610))]),
+    'black_magic_right': ((735, 1055), 'bottom left', False, [
+        (('vertical', 0), (400, 600), (330, 5)),
+        (('vertical', 0), (300, 440), (15, 5)),
+        (('vertical', 1), (400, 600), (5, 450)),
+        (('vertical', 1), (300, 440), (15, 5)),
+        (('vertical', 2), (300, 440), (420, 610)),
+        (('vertical', 3), (300, 440), (15, 5))]),
+    'portfolio': ((1200, 1200), 'bottom left', True, [
+        (('hero', 0), (1200, 600), (0, 0)),
+        (('vertical', 0), (400, 600), (0, 600)),
+        (('vertical', 1), (400, 600), (400, 600)),
+        (('vertical', 2), (400, 600), (800, 600))]),
+}
+
+
+@pytest.fixture
+def templates(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    return load_templates('layouts')
+
+
+def solid_pools():
+    """
+    One solid colour per photo, so every cell and its overlap order can be
+    told apart and resizing is exact whichever path it takes
+    """
+    pools = {}
+    for p, (pool, size) in enumerate([('horizontal', (150, 100)), ('vertical', (100, 150)), ('hero', (200, 100))]):
+        pools[pool] = [Image.new('RGB', size, (40 + 50 * p, 30 * i, 255 - 30 * i)) for i in range(4)]
+    return pools
+
+
+def hard_coded(name, pools):
+    canvas, text, logo, pastes = HARD_CODED[name]
+    bg = Image.new('RGB', canvas, (255, 255, 255))
+    for (pool, slot), size, position in pastes:
+        bg.paste(pools[pool][slot].resize(size, Image.LANCZOS), position)
+    return bg
+
+
+def test_every_hard_coded_layout_has_a_template(templates):
+    assert set(HARD_CODED) == set(templates)
+
+
+@pytest.mark.parametrize('name', sorted(HARD_CODED))
+def test_template_renders_like_the_hard_coded_layout(templates, name):
+    template = templates[name]
+    canvas, text, logo, pastes = HARD_CODED[name]
+    assert (tuple(template.canvas), template.text, template.logo) == (canvas, text, logo)
+    pools = solid_pools()
+    bg = template.compile().render(pools)
+    assert bg.tobytes() == hard_coded(name, pools).tobytes()
+
+
+def test_black_magic_cells_overlap_in_paste_order(templates):
+    pools = solid_pools()
+    bg = templates['black_magic_left'].compile().render(pools)
+    vertical = [image.getpixel((0, 0)) for image in pools['vertical']]
+    # the second photo is pasted over the lower right corner of the first
+    assert bg.getpixel((350, 500)) == vertical[1]
+    assert bg.getpixel((400, 600)) == vertical[1]
+    assert bg.getpixel((320, 500)) == vertical[0]
+    assert bg.getpixel((350, 440)) == vertical[0]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the persistent per-image metadata cache
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import itertools
+import os
+import pytest
+import metadata_cache
+from metadata_cache import MetadataCache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # one tick per call, so least recently used is never a tie
+    ticks = itertools.count(1)
+    monkeypatch.setattr(metadata_cache.time, 'time', lambda: float(next(ticks)))
+
+
+def photo(directory, name, content):
+    path = os.path.join(str(directory), name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def test_stored_entry_is_found_again(tmp_path):
+    path = photo(tmp_path, 'a.jpg', b'a' * 100)
+    cache = MetadataCache(str(tmp_path))
+    key, entry = cache.lookup(path)
+    assert entry is None
+    cache.store(key, size=(640, 480), orientation=6, faces=[[1, 2, 3, 4]], colour=(10, 20, 30))
+    cache.close()
+
+    cache = MetadataCache(str(tmp_path))
+    assert cache.lookup(path) == (key, {'size': (640, 480), 'orientation': 6,
+                                        'faces': [[1, 2, 3, 4]], 'colour': (10, 20, 30)})
+    assert os.path.exists(os.path.join(str(tmp_path), MetadataCache.filename))
+
+
+def test_unchanged_file_is_not_hashed_again(tmp_path, monkeypatch):
+    path = photo(tmp_path, 'a.jpg', b'a' * 100)
+    cache = MetadataCache(str(tmp_path))
+    key, entry = cache.lookup(path)
+    cache.store(key, size=(640, 480))
+
+    def digest(path):
+        raise AssertionError('hashed %s' % path)
+    monkeypatch.setattr(cache, 'digest', digest)
+    assert cache.lookup(path)[1]['size'] == (640, 480)
+
+
+def test_touched_or_moved_file_keeps_its_entry(tmp_path):
+    path = photo(tmp_path, 'a.jpg', b'a' * 100)
+    cache = MetadataCache(str(tmp_path))
+    key, entry = cache.lookup(path)
+    cache.store(key, size=(640, 480))
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.lookup(path) == (key, {'size': (640, 480), 'orientation': None, 'faces': None, 'colour': None})
+
+    moved = os.path.join(str(tmp_path), 'b.jpg')
+    os.rename(path, moved)
+    assert cache.lookup(moved)[0] == key
+    assert cache.lookup(moved)[1]['size'] == (640, 480)
+
+
+def test_changed_content_is_stale(tmp_path):
+    path = photo(tmp_path, 'a.jpg', b'a' * 100)
+    cache = MetadataCache(str(tmp_path))
+    key, entry = cache.lookup(path)
+    cache.store(key, size=(640, 480))
+
+    stat = os.stat(path)
+    photo(tmp_path, 'a.jpg', b'b' * 100)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    new_key, entry = cache.lookup(path)
+    assert new_key != key and entry is None
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    path = photo(tmp_path, 'a.jpg', b'a' * 100)
+    cache = MetadataCache(str(tmp_path))
+    key, entry = cache.lookup(path)
+    cache.store(key, size=(640, 480))
+    cache.connect().execute("UPDATE images SET faces = '[1, ' WHERE digest = ?", (key,))
+    assert cache.lookup(path) == (key, None)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    keys = []
+    for i in range(3):
+        path = photo(tmp_path, '%d.jpg' % i, bytes([i]) * 100)
+        key, entry = cache.lookup(path)
+        cache.store(key, size=(640, 480), faces=[[i, i, 10, 10]] * 20)
+        keys.append((path, key))
+    entry_bytes = cache._total // 3
+    # use the first entry again, the second one is now the least recently used
+    assert cache.lookup(keys[0][0])[1] is not None
+
+    cache.max_bytes = entry_bytes * 2 + entry_bytes // 2
+    path = photo(tmp_path, '3.jpg', b'\x03' * 100)
+    key, entry = cache.lookup(path)
+    cache.store(key, size=(640, 480), faces=[[3, 3, 10, 10]] * 20)
+
+    assert cache._total <= cache.max_bytes
+    stored = set(row[0] for row in cache.connect().execute('SELECT digest FROM images'))
+    assert keys[1][1] not in stored
+    assert set([keys[0][1], key]) <= stored
+    assert cache.lookup(keys[1][0])[1] is None
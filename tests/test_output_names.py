@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the collision-free output names
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import errno
+import os
+from PIL import Image
+from output_names import OutputNames
+
+
+def test_sequence_numbers_follow_each_other(tmp_path):
+    names = OutputNames(str(tmp_path))
+    first, second = names.name(), names.name('-300px', '.png')
+    assert first.endswith('-001.jpg') and second.endswith('-002-300px.png')
+    assert os.path.dirname(first) == str(tmp_path)
+
+
+def test_save_publishes_without_temporary_files(tmp_path):
+    names = OutputNames(str(tmp_path))
+    filename = names.save(Image.new('RGB', (8, 8)), names.name(), quality=90)
+    assert os.listdir(str(tmp_path)) == [os.path.basename(filename)]
+    assert Image.open(filename).size == (8, 8)
+
+
+def test_collision_moves_to_next_name_with_suffix(tmp_path):
+    names = OutputNames(str(tmp_path))
+    taken = names.name('-2-300px')
+    with open(taken, 'wb') as f:
+        f.write(b'other run')
+    filename = names.write(b'collage', taken, '-2-300px')
+    assert filename != taken and filename.endswith('-002-2-300px.jpg')
+    assert open(taken, 'rb').read() == b'other run'
+    assert open(filename, 'rb').read() == b'collage'
+
+
+def test_without_hard_links_existing_files_are_kept(tmp_path, monkeypatch):
+    def link(src, dst):
+        raise OSError(errno.EPERM, 'Operation not permitted')
+    monkeypatch.setattr(os, 'link', link)
+    names = OutputNames(str(tmp_path))
+    taken = names.name()
+    with open(taken, 'wb') as f:
+        f.write(b'other run')
+    filename = names.write(b'collage', taken)
+    assert filename.endswith('-002.jpg')
+    assert open(taken, 'rb').read() == b'other run'
+    assert open(filename, 'rb').read() == b'collage'
+    assert sorted(os.listdir(str(tmp_path))) == sorted(os.path.basename(f) for f in (taken, filename))
+
+
+def test_other_link_errors_are_raised(tmp_path, monkeypatch):
+    def link(src, dst):
+        raise OSError(errno.EIO, 'Input/output error')
+    monkeypatch.setattr(os, 'link', link)
+    names = OutputNames(str(tmp_path))
+    try:
+        names.write(b'collage', names.name())
+    except OSError as e:
+        assert e.errno == errno.EIO
+    else:
+        raise AssertionError('EIO was not raised')
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the cached split masks of the diagonal layouts
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+import numpy as np
+import pytest
+from PIL import Image
+from image_process import ImageProcess
+
+
+def noise(size, seed):
+    rng = np.random.RandomState(seed)
+    return Image.fromarray(rng.randint(0, 256, (size[1], size[0], 3)).astype(np.uint8))
+
+
+def pixel_loop(image1, image2, size, a, b, c):
+    """
+    The per-pixel loop collage_2_hor used before the split masks
+    """
+    bg = Image.new('RGB', size, (255, 255, 255))
+    # pixel access objects, the same loop as getpixel / putpixel only faster
+    out, pixels1, pixels2 = bg.load(), image1.load(), image2.load()
+    for i in range(bg.size[0]):
+        for j in range(bg.size[1]):
+            if(a * i + b * j <= c):
+                out[i, j] = pixels1[i, j]
+            else:
+                out[i, j] = pixels2[i, j]
+    return bg
+
+
+@pytest.mark.parametrize('a, b, c', [(4, 1, 2800), (4, -1, 2000)])
+@pytest.mark.parametrize('scale', [1.0, 0.5])
+def test_diagonal_composite_matches_the_pixel_loop(a, b, c, scale):
+    # collage_2_hor splits a 1200x800 layout, scaled with the renditions
+    size = (int(1200 * scale), int(800 * scale))
+    c = c * scale
+    image1, image2 = noise(size, 1), noise(size, 2)
+    process = ImageProcess()
+    composite = process.diagonal_composite(image1, image2, size, a, b, c)
+    assert composite.tobytes() == pixel_loop(image1, image2, size, a, b, c).tobytes()
+
+
+def test_split_masks_are_cached_per_size_and_line():
+    process = ImageProcess()
+    mask = process.split_mask((120, 80), 4, 1, 280)
+    assert process.split_mask((120, 80), 4, 1, 280) is mask
+    assert process.split_mask((120, 80), 4, -1, 200) is not mask
+    assert process.split_mask((240, 160), 4, 1, 280).size == (240, 160)
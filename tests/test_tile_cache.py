@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     Tests of the resized tile cache
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from PIL import Image
+from tile_cache import TileCache
+
+
+def photo(size=(400, 300), colour=(200, 80, 40)):
+    return Image.new('RGB', size, colour)
+
+
+def test_same_tile_is_a_hit():
+    cache = TileCache()
+    image = photo()
+    first = cache.tile(image, (100, 75))
+    assert cache.tile(image, (100, 75)) is first
+    assert first.size == (100, 75)
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'tiles': 1, 'nbytes': 100 * 75 * 3}
+
+
+def test_size_box_and_filter_are_part_of_the_key():
+    cache = TileCache()
+    image = photo()
+    cache.tile(image, (100, 75))
+    cache.tile(image, (50, 50))
+    cache.tile(image, (100, 75), box=(0, 0, 200, 150))
+    cache.tile(image, (100, 75), resample=Image.BILINEAR)
+    cache.tile(photo(), (100, 75))
+    assert cache.hits == 0 and cache.misses == 5 and cache.stats()['tiles'] == 5
+
+
+def test_least_recently_used_tiles_are_evicted():
+    tile_bytes = 100 * 100 * 3
+    cache = TileCache(max_bytes=2 * tile_bytes)
+    a, b, c = photo(), photo(), photo()
+    cache.tile(a, (100, 100))
+    cache.tile(b, (100, 100))
+    cache.tile(a, (100, 100))
+    cache.tile(c, (100, 100))
+    assert cache.stats()['tiles'] == 2 and cache.nbytes == 2 * tile_bytes
+    cache.tile(a, (100, 100))
+    assert cache.hits == 2
+    cache.tile(b, (100, 100))
+    assert cache.misses == 4
+
+
+def test_clear_drops_tiles_but_keeps_counts():
+    cache = TileCache()
+    image = photo()
+    cache.tile(image, (100, 75))
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 1, 'tiles': 0, 'nbytes': 0}
+    cache.tile(image, (100, 75))
+    assert cache.misses == 2
+
+
+def test_palette_source():
+    image = Image.new('P', (400, 300), 1)
+    image.putpalette([0, 0, 0, 200, 80, 40])
+    tile = TileCache().tile(image, (100, 75))
+    assert tile.size == (100, 75) and tile.getpixel((50, 37)) == (200, 80, 40)
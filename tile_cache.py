@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Project:    Automatic Collage Maker
+Script:     In-process cache of resized collage tiles
+@author:    Pranav Gundewar
+"""
+# Importing Libraries
+from collections import OrderedDict
+from PIL import Image
+from image_handle import ImageHandle
+from image_pyramid import ImagePyramid
+import threading
+
+
+class TileCache():
+    """
+    LRU cache of resized tiles keyed by (image id, target size, crop box,
+    resample filter), so a photo used at the same size by several layouts is
+    resampled once per run. The pixel bytes of the stored tiles are bounded by
+    max_bytes, least recently used tiles are evicted first. hits and misses
+    count the lookups since the cache was created.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tile(self, image, size, box=None, resample=Image.LANCZOS):
+        """
+        Returns image (or ImageHandle), cropped to box when given, resized to
+        size. The returned tile is shared, callers must not modify it in place.
+        """
+        size = tuple(size)
+        box = tuple(box) if box is not None else None
+        key = (id(image), size, box, resample)
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # start from the smallest pyramid level which still covers the tile
+        pyramid = image.pyramid() if isinstance(image, ImageHandle) else ImagePyramid(image)
+        tile = pyramid.resize(size, resample, box)
+        nbytes = tile.size[0] * tile.size[1] * len(tile.getbands())
+        with self._lock:
+            # the entry keeps the image alive, so its id cannot be reused meanwhile
+            if key not in self._tiles:
+                self._tiles[key] = (image, tile, nbytes)
+                self.nbytes += nbytes
+            while self.nbytes > self.max_bytes and len(self._tiles) > 1:
+                old_key, (old_image, old_tile, old_nbytes) = self._tiles.popitem(last=False)
+                self.nbytes -= old_nbytes
+        return tile
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """
+        Returns hits, misses, tiles held and their bytes as a dict
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'tiles': len(self._tiles), 'nbytes': self.nbytes}